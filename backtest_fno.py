@@ -8,14 +8,44 @@ Note: Historical option data is limited. This uses:
 
 For production backtesting, use actual option chain data from NSE/broker.
 """
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List
+from numpy.lib.stride_tricks import sliding_window_view
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
 import yfinance as yf
 
+from config.settings import BACKTEST_CACHE_DIR, BACKTEST_CACHE_TTL_SECONDS
 from strategies.weekly_option_selling import WeeklyOptionSellingStrategy
-from utils.greeks import calculate_greeks
+from utils.greeks import black_scholes_premium
+from utils.bs_fast import (
+    bs_premium, bs_premium_batch, bs_premium_gpu,
+    CUPY_AVAILABLE, GPU_MIN_BATCH, NUMBA_AVAILABLE, warm_up_kernels
+)
+
+RISK_FREE_RATE = 0.07
+VOL_WINDOW = 20  # Trading days in the historical volatility window
+
+# Option type flags; "CE"/"PE" strings are converted once at the boundary
+CALL, PUT = 1, 0
+
+# Time-to-expiry terms for the integer DTEs a weekly cycle can produce,
+# so the pricing batch indexes tables instead of recomputing sqrt/exp
+_MAX_TABLE_DTE = 10
+_DTE_YEARS = np.arange(_MAX_TABLE_DTE + 1) / 365.0
+_DTE_SQRT_T = np.sqrt(_DTE_YEARS)
+_DTE_DISCOUNT = np.exp(-RISK_FREE_RATE * _DTE_YEARS)
+
+# Per-trade fields, stored column-wise (one list per field)
+TRADE_COLUMNS = (
+    "entry_date", "exit_date", "symbol", "put_strike", "call_strike",
+    "put_entry_premium", "call_entry_premium", "put_exit_premium",
+    "call_exit_premium", "put_pnl", "call_pnl", "total_pnl", "exit_reason"
+)
 
 
 class FnOBacktester:
@@ -30,8 +60,21 @@ class FnOBacktester:
         """
         self.initial_capital = initial_capital
         self.capital = initial_capital
-        self.trades = []
-        self.equity_curve = []
+        self._trade_cols = {column: [] for column in TRADE_COLUMNS}
+        
+        # Equity curve as parallel lists; see the equity_curve property
+        self._eq_date = []
+        self._eq_cap = []
+        self._eq_pnl = []
+        
+        # Compile the pricing kernels before the first simulated week
+        warm_up_kernels()
+    
+    @property
+    def equity_curve(self) -> List[Dict]:
+        """Equity curve as a list of {date, capital, pnl} records."""
+        return [{"date": d, "capital": c, "pnl": p}
+                for d, c, p in zip(self._eq_date, self._eq_cap, self._eq_pnl)]
     
     def fetch_historical_data(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -45,22 +88,62 @@ class FnOBacktester:
         Returns:
             DataFrame with OHLCV data
         """
-        print(f"  Fetching {symbol} data from {start_date} to {end_date}...")
-        
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(start=start_date, end=end_date, interval="1d")
+        df = self._load_history(symbol, start_date, end_date, interval="1d")
         
         if df.empty:
             raise ValueError(f"No data found for {symbol}")
         
+        # Trading-day lookups binary-search the index, so it must be sorted
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        
         # Calculate historical volatility (20-day rolling)
-        df['returns'] = df['Close'].pct_change()
-        df['volatility'] = df['returns'].rolling(window=20).std() * np.sqrt(252)
-        df['volatility'] = df['volatility'].fillna(0.3)  # Default 30% IV
+        close = df['Close'].to_numpy(np.float64)
+        returns = np.full(len(close), np.nan)
+        returns[1:] = np.diff(close) / close[:-1]
+        
+        volatility = np.full(len(close), 0.3)  # Default 30% IV
+        if len(close) > VOL_WINDOW:
+            windows = sliding_window_view(returns[1:], VOL_WINDOW)
+            volatility[VOL_WINDOW:] = windows.std(axis=-1, ddof=1) * np.sqrt(252)
+            volatility[np.isnan(volatility)] = 0.3
+        
+        df['returns'] = returns
+        df['volatility'] = volatility
         
         print(f"  Loaded {len(df)} days of data")
         return df
     
+    def _load_history(self, symbol: str, start_date: str, end_date: str,
+                      interval: str) -> pd.DataFrame:
+        """
+        Download price history, reusing an on-disk copy when possible.
+        
+        Ranges that end before today never change and are cached forever;
+        ranges touching today are refreshed after BACKTEST_CACHE_TTL_SECONDS.
+        """
+        cache_path = os.path.join(
+            BACKTEST_CACHE_DIR,
+            f"{symbol.lstrip('^')}_{start_date}_{end_date}_{interval}.pkl"
+        )
+        
+        if os.path.exists(cache_path):
+            age = time.time() - os.path.getmtime(cache_path)
+            if end_date < date.today().isoformat() or age < BACKTEST_CACHE_TTL_SECONDS:
+                print(f"  Using cached {symbol} data from {start_date} to {end_date}")
+                return pd.read_pickle(cache_path)
+        
+        print(f"  Fetching {symbol} data from {start_date} to {end_date}...")
+        
+        ticker = yf.Ticker(symbol)
+        df = ticker.history(start=start_date, end=end_date, interval=interval)
+        
+        if not df.empty:
+            os.makedirs(BACKTEST_CACHE_DIR, exist_ok=True)
+            df.to_pickle(cache_path)
+        
+        return df
+    
     def get_weekly_expiries(self, start_date: str, end_date: str, 
                            expiry_day: int = 3) -> List[str]:
         """
@@ -74,20 +157,14 @@ class FnOBacktester:
         Returns:
             List of expiry dates
         """
-        expiries = []
-        current = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        
-        while current <= end:
-            if current.weekday() == expiry_day:
-                expiries.append(current.strftime("%Y-%m-%d"))
-            current += timedelta(days=1)
-        
-        return expiries
+        all_days = pd.date_range(start_date, end_date, freq="D")
+        expiries = all_days[all_days.weekday == expiry_day]
+        return expiries.strftime("%Y-%m-%d").tolist()
     
     def estimate_option_premium(self, spot: float, strike: float, 
                                days_to_expiry: int, volatility: float,
-                               option_type: str = "PE") -> float:
+                               option_type: str = "PE",
+                               is_call: Optional[int] = None) -> float:
         """
         Estimate option premium using Black-Scholes.
         
@@ -97,40 +174,110 @@ class FnOBacktester:
             days_to_expiry: Days to expiry
             volatility: Implied volatility
             option_type: "CE" or "PE"
+            is_call: CALL or PUT flag; overrides option_type when given
         
         Returns:
             Estimated premium
         """
-        time_to_expiry = days_to_expiry / 365.0
+        if is_call is None:
+            is_call = CALL if option_type == "CE" else PUT
+        
+        # At expiry, intrinsic value only
+        if days_to_expiry <= 0:
+            if is_call:
+                return spot - strike if spot > strike else 0
+            return strike - spot if strike > spot else 0
         
-        if time_to_expiry <= 0:
-            # At expiry, intrinsic value only
-            if option_type == "CE":
-                return max(0, spot - strike)
-            else:  # PE
-                return max(0, strike - spot)
+        time_to_expiry = days_to_expiry / 365.0
         
         # Ensure volatility is reasonable
         if volatility <= 0 or np.isnan(volatility):
             volatility = 0.20  # Default 20% IV
         
-        try:
-            greeks = calculate_greeks(spot, strike, time_to_expiry, volatility, 
-                                     risk_free_rate=0.07, option_type=option_type)
-            premium = greeks["premium"]
-            
-            # Sanity check - premium should be positive for OTM options
-            if premium <= 0:
-                # Fallback: simple time value estimation
-                moneyness = abs(spot - strike) / spot
-                premium = spot * 0.01 * np.sqrt(time_to_expiry) * (1 + moneyness * 2)
-            
-            return max(premium, 1)  # Minimum ₹1
-        except Exception as e:
-            # Fallback calculation
+        premium = round(bs_premium(float(spot), float(strike), time_to_expiry, RISK_FREE_RATE,
+                                   float(volatility), is_call == CALL), 2)
+        
+        # Sanity check - premium should be positive for OTM options
+        if premium <= 0:
+            # Fallback: simple time value estimation
             moneyness = abs(spot - strike) / spot
             premium = spot * 0.01 * np.sqrt(time_to_expiry) * (1 + moneyness * 2)
-            return max(premium, 1)
+        
+        return max(premium, 1)  # Minimum ₹1
+    
+    def estimate_option_premiums_batch(self, spots, strikes, days_to_expiry,
+                                       volatilities, is_call) -> np.ndarray:
+        """
+        Vectorized estimate_option_premium over arrays of contracts.
+        
+        Applies the same rules as the scalar version (intrinsic value at
+        expiry, default IV, time value fallback, ₹1 floor) with one
+        Black-Scholes pass over the whole batch. Batches of GPU_MIN_BATCH
+        contracts or more are priced on the GPU when CuPy finds a device;
+        otherwise the parallel Numba kernel is used when Numba is installed.
+        
+        Args:
+            spots: Spot prices
+            strikes: Strike prices
+            days_to_expiry: Days to expiry
+            volatilities: Implied volatilities
+            is_call: Array of CALL/PUT flags (or booleans)
+        
+        Returns:
+            Array of estimated premiums
+        """
+        spots = np.asarray(spots, dtype=np.float64)
+        strikes = np.asarray(strikes, dtype=np.float64)
+        volatilities = np.asarray(volatilities, dtype=np.float64)
+        is_call = np.asarray(is_call, dtype=bool)
+        days_to_expiry = np.asarray(days_to_expiry)
+        
+        if (days_to_expiry.dtype.kind in "iu" and days_to_expiry.size
+                and 0 <= days_to_expiry.min() and days_to_expiry.max() <= _MAX_TABLE_DTE):
+            time_to_expiry = _DTE_YEARS[days_to_expiry]
+            sqrt_t = _DTE_SQRT_T[days_to_expiry]
+            discount = _DTE_DISCOUNT[days_to_expiry]
+        else:
+            time_to_expiry = days_to_expiry.astype(np.float64) / 365.0
+            sqrt_t = np.sqrt(np.maximum(time_to_expiry, 0))
+            discount = np.exp(-RISK_FREE_RATE * time_to_expiry)
+        
+        # At expiry, intrinsic value only
+        intrinsic = np.where(is_call, np.maximum(0, spots - strikes),
+                             np.maximum(0, strikes - spots))
+        live = time_to_expiry > 0
+        if not live.any():
+            return intrinsic
+        
+        # Ensure volatility is reasonable
+        volatilities = np.where((volatilities <= 0) | np.isnan(volatilities),
+                                0.20, volatilities)
+        
+        # Price every contract with time value left in a single call
+        premiums = intrinsic.copy()
+        t_live = time_to_expiry[live]
+        sqrt_t_live = sqrt_t[live]
+        if CUPY_AVAILABLE and len(t_live) >= GPU_MIN_BATCH:
+            bs = bs_premium_gpu(spots[live], strikes[live], t_live, RISK_FREE_RATE,
+                                volatilities[live], is_call[live])
+        elif NUMBA_AVAILABLE:
+            bs = bs_premium_batch(spots[live], strikes[live], t_live, sqrt_t_live,
+                                  discount[live], RISK_FREE_RATE,
+                                  volatilities[live], is_call[live])
+        else:
+            bs = black_scholes_premium(spots[live], strikes[live], t_live,
+                                       volatilities[live], risk_free_rate=RISK_FREE_RATE,
+                                       is_call=is_call[live], sqrt_t=sqrt_t_live,
+                                       discount=discount[live])
+        bs = np.round(bs, 2)
+        
+        # Sanity check - premium should be positive for OTM options
+        moneyness = np.abs(spots[live] - strikes[live]) / spots[live]
+        fallback = spots[live] * 0.01 * sqrt_t_live * (1 + moneyness * 2)
+        bs = np.where(bs > 0, bs, fallback)
+        
+        premiums[live] = np.maximum(bs, 1)  # Minimum ₹1
+        return premiums
     
     def backtest_weekly_option_selling(self, symbol: str, start_date: str, 
                                       end_date: str, otm_pct: float = 0.15) -> Dict:
@@ -141,6 +288,10 @@ class FnOBacktester:
         - Every Monday: Sell OTM Put & Call (15% OTM)
         - Exit on Thursday or when 50% profit or 2x loss
         
+        Every (cycle, day, leg) contract is collected first and priced in a
+        single estimate_option_premiums_batch call; exit conditions are then
+        evaluated as boolean masks over the (cycle, day) grid.
+        
         Args:
             symbol: "^NSEI" or "^NSEBANK"
             start_date: Start date
@@ -153,6 +304,17 @@ class FnOBacktester:
         # Fetch historical data
         df = self.fetch_historical_data(symbol, start_date, end_date)
         
+        # Positional arrays: index by trading-day position instead of labels
+        index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        trading_days = index.normalize().to_numpy().astype("datetime64[D]")
+        close_arr = df['Close'].to_numpy(np.float64)
+        vol_arr = df['volatility'].to_numpy(np.float64)
+        
+        # Integer day numbers (days since 1970-01-01, a Thursday) and weekdays
+        day_numbers = trading_days.astype(np.int64)
+        weekdays = ((day_numbers + 3) % 7).tolist()
+        day_numbers = day_numbers.tolist()
+        
         # Get weekly expiries
         expiry_day = 3 if symbol == "^NSEI" else 2  # Thursday for Nifty, Wednesday for BankNifty
         expiries = self.get_weekly_expiries(start_date, end_date, expiry_day)
@@ -161,193 +323,209 @@ class FnOBacktester:
         
         symbol_name = "NIFTY" if symbol == "^NSEI" else "BANKNIFTY"
         lot_size = 50 if symbol == "^NSEI" else 15
-        
-        trades_attempted = 0
-        trades_skipped = 0
-        
-        for expiry_date in expiries:
-            trades_attempted += 1
-            expiry_dt = datetime.strptime(expiry_date, "%Y-%m-%d")
-            
-            # Find Monday of the same week (entry day)
-            # If expiry is Thursday (weekday 3), Monday is 3 days before
-            days_back = expiry_dt.weekday()  # 0=Mon, 3=Thu
-            entry_dt = expiry_dt - timedelta(days=days_back)
-            
-            # Find nearest trading day to Monday
-            entry_date = None
-            for offset in range(5):  # Check Mon-Fri
-                check_date = (entry_dt + timedelta(days=offset)).strftime("%Y-%m-%d")
-                if check_date in df.index:
-                    entry_date = check_date
-                    entry_dt = datetime.strptime(entry_date, "%Y-%m-%d")
-                    break
-            
-            if not entry_date:
+        strike_step = 50  # Both indices are backtested on 50-point strikes
+        
+        # Pass 1: lay out every cycle and the contracts it needs priced
+        spots, strikes, dtes, vols, is_call = [], [], [], [], []
+        attempts, expiry_dates, expiry_positions, entry_dates = [], [], [], []
+        entry_spots, put_strikes, call_strikes, entry_offsets = [], [], [], []
+        cycle_days = []
+        
+        def add_contracts(spot, vol, days, put_strike, call_strike):
+            spots.extend((spot, spot))
+            strikes.extend((put_strike, call_strike))
+            dtes.extend((days, days))
+            vols.extend((vol, vol))
+            is_call.extend((PUT, CALL))
+            return len(spots) - 2  # Offset of the put; call follows
+        
+        # Entry day: first trading day of the expiry week (Mon-Fri)
+        # If expiry is Thursday (weekday 3), Monday is 3 days before
+        expiry_days = np.array(expiries, dtype="datetime64[D]")
+        mondays = expiry_days - expiry_day
+        entry_positions = np.searchsorted(trading_days, mondays)
+        has_entry = entry_positions < len(trading_days)
+        has_entry[has_entry] = trading_days[entry_positions[has_entry]] < mondays[has_entry] + 5
+        
+        # Trading days up to and including expiry end just before end_positions
+        end_positions = np.searchsorted(trading_days, expiry_days, side="right")
+        on_expiry = end_positions > 0
+        on_expiry[on_expiry] = trading_days[end_positions[on_expiry] - 1] == expiry_days[on_expiry]
+        expiry_numbers = expiry_days.astype(np.int64).tolist()
+        
+        # Calculate strikes for every cycle at once (np.rint rounds half to even, like round)
+        entry_closes = close_arr[np.minimum(entry_positions, len(close_arr) - 1)]
+        all_put_strikes = (np.rint(entry_closes * (1 - otm_pct) / strike_step)
+                           .astype(np.int64) * strike_step).tolist()
+        all_call_strikes = (np.rint(entry_closes * (1 + otm_pct) / strike_step)
+                            .astype(np.int64) * strike_step).tolist()
+        
+        for attempt, (expiry_date, expiry_num, entry_pos, end_pos, put_strike, call_strike) in enumerate(
+                zip(expiries, expiry_numbers, entry_positions.tolist(), end_positions.tolist(),
+                    all_put_strikes, all_call_strikes),
+                start=1):
+            if not has_entry[attempt - 1]:
                 continue
             
             # Entry conditions
-            entry_spot = df.loc[entry_date, 'Close']
-            entry_vol = df.loc[entry_date, 'volatility']
-            
-            # Calculate strikes
-            put_strike = round(entry_spot * (1 - otm_pct) / 50) * 50
-            call_strike = round(entry_spot * (1 + otm_pct) / 50) * 50
+            entry_spot = close_arr[entry_pos]
+            entry_vol = vol_arr[entry_pos]
             
             # Calculate days to expiry
-            days_to_expiry = (expiry_dt - entry_dt).days
-            
-            # Estimate premiums at entry
-            put_premium = self.estimate_option_premium(
-                entry_spot, put_strike, days_to_expiry, entry_vol, "PE"
-            )
-            call_premium = self.estimate_option_premium(
-                entry_spot, call_strike, days_to_expiry, entry_vol, "CE"
-            )
-            
-            # Skip if premiums too low (₹20 minimum for realistic trading)
-            if put_premium < 20 or call_premium < 20:
-                trades_skipped += 1
-                if trades_attempted <= 3:  # Debug first few
-                    print(f"    Skipped {entry_date}: Put=₹{put_premium:.0f}, Call=₹{call_premium:.0f}")
-                continue
-            
-            if trades_attempted <= 3:  # Debug first few
-                print(f"    Trade {trades_attempted}: Entry={entry_date}, Spot=₹{entry_spot:.0f}, Put=₹{put_premium:.0f}, Call=₹{call_premium:.0f}")
-            
-            # Simulate holding until exit
-            exit_date = None
-            exit_reason = ""
-            put_exit_premium = 0
-            call_exit_premium = 0
+            days_to_expiry = expiry_num - day_numbers[entry_pos]
+            entry_offsets.append(add_contracts(entry_spot, entry_vol, days_to_expiry,
+                                               put_strike, call_strike))
             
-            # Check each day until expiry
-            current_dt = entry_dt + timedelta(days=1)
-            while current_dt <= expiry_dt:
-                current_date = current_dt.strftime("%Y-%m-%d")
-                
-                if current_date not in df.index:
-                    current_dt += timedelta(days=1)
-                    continue
-                
-                current_spot = df.loc[current_date, 'Close']
-                current_vol = df.loc[current_date, 'volatility']
-                days_left = (expiry_dt - current_dt).days
-                
-                # Estimate current premiums
-                put_current = self.estimate_option_premium(
-                    current_spot, put_strike, days_left, current_vol, "PE"
-                )
-                call_current = self.estimate_option_premium(
-                    current_spot, call_strike, days_left, current_vol, "CE"
-                )
-                
-                # Check exit conditions
-                # 1. Profit target (50% of premium)
-                if put_current <= put_premium * 0.5:
-                    exit_date = current_date
-                    exit_reason = "Put Target Hit"
-                    put_exit_premium = put_current
-                    call_exit_premium = call_current
-                    break
-                
-                if call_current <= call_premium * 0.5:
-                    exit_date = current_date
-                    exit_reason = "Call Target Hit"
-                    put_exit_premium = put_current
-                    call_exit_premium = call_current
-                    break
-                
-                # 2. Stop loss (2x premium)
-                if put_current >= put_premium * 2.0:
-                    exit_date = current_date
-                    exit_reason = "Put Stop Loss"
-                    put_exit_premium = put_current
-                    call_exit_premium = call_current
-                    break
-                
-                if call_current >= call_premium * 2.0:
-                    exit_date = current_date
-                    exit_reason = "Call Stop Loss"
-                    put_exit_premium = put_current
-                    call_exit_premium = call_current
-                    break
-                
-                # 3. Exit on Thursday (day before expiry for safety)
-                if current_dt.weekday() == 3:  # Thursday
-                    exit_date = current_date
-                    exit_reason = "Thursday Exit"
-                    put_exit_premium = put_current
-                    call_exit_premium = call_current
-                    break
-                
-                current_dt += timedelta(days=1)
+            # Every trading day until expiry
+            days = []
+            for pos in range(entry_pos + 1, end_pos):
+                offset = add_contracts(close_arr[pos], vol_arr[pos],
+                                       expiry_num - day_numbers[pos],
+                                       put_strike, call_strike)
+                days.append((pos, weekdays[pos], offset))
             
-            # If no exit, close at expiry
-            if not exit_date:
-                exit_date = expiry_date
-                exit_reason = "Expiry"
-                exit_spot = df.loc[expiry_date, 'Close'] if expiry_date in df.index else entry_spot
-                put_exit_premium = max(0, put_strike - exit_spot)
-                call_exit_premium = max(0, exit_spot - call_strike)
-            
-            # Calculate P&L
-            put_pnl = (put_premium - put_exit_premium) * lot_size
-            call_pnl = (call_premium - call_exit_premium) * lot_size
-            total_pnl = put_pnl + call_pnl
-            
-            # Record trades
-            self.trades.append({
-                "entry_date": entry_date,
-                "exit_date": exit_date,
-                "symbol": symbol_name,
-                "put_strike": put_strike,
-                "call_strike": call_strike,
-                "put_entry_premium": put_premium,
-                "call_entry_premium": call_premium,
-                "put_exit_premium": put_exit_premium,
-                "call_exit_premium": call_exit_premium,
-                "put_pnl": put_pnl,
-                "call_pnl": call_pnl,
-                "total_pnl": total_pnl,
-                "exit_reason": exit_reason
-            })
-            
-            # Update capital
-            self.capital += total_pnl
-            self.equity_curve.append({
-                "date": exit_date,
-                "capital": self.capital,
-                "pnl": total_pnl
-            })
+            attempts.append(attempt)
+            expiry_dates.append(expiry_date)
+            expiry_positions.append(end_pos - 1 if on_expiry[attempt - 1] else -1)
+            entry_dates.append(str(trading_days[entry_pos]))
+            entry_spots.append(entry_spot)
+            put_strikes.append(put_strike)
+            call_strikes.append(call_strike)
+            cycle_days.append(days)
+        
+        # Pass 2: price every contract in one vectorized call
+        premiums = self.estimate_option_premiums_batch(spots, strikes, dtes, vols, is_call)
+        
+        # Pass 3: evaluate every exit condition for every (cycle, day) at once
+        n_cycles = len(cycle_days)
+        n_days = max([1] + [len(days) for days in cycle_days])
+        day_positions = np.zeros((n_cycles, n_days), dtype=np.int64)
+        day_offsets = np.zeros((n_cycles, n_days), dtype=np.int64)
+        day_weekdays = np.full((n_cycles, n_days), -1)
+        day_valid = np.zeros((n_cycles, n_days), dtype=bool)
+        for i, days in enumerate(cycle_days):
+            for j, (pos, weekday, offset) in enumerate(days):
+                day_positions[i, j] = pos
+                day_offsets[i, j] = offset
+                day_weekdays[i, j] = weekday
+                day_valid[i, j] = True
+        
+        attempts = np.array(attempts, dtype=np.int64)
+        expiry_dates = np.array(expiry_dates, dtype=str)
+        expiry_positions = np.array(expiry_positions, dtype=np.int64)
+        entry_dates = np.array(entry_dates, dtype=str)
+        entry_spots = np.array(entry_spots, dtype=np.float64)
+        put_strikes = np.array(put_strikes, dtype=np.int64)
+        call_strikes = np.array(call_strikes, dtype=np.int64)
+        entry_offsets = np.array(entry_offsets, dtype=np.int64)
+        
+        put_entry = premiums[entry_offsets]
+        call_entry = premiums[entry_offsets + 1]
+        put_px = premiums[day_offsets]
+        call_px = premiums[day_offsets + 1]
+        
+        # In priority order, matching the reason reported for each
+        exit_reasons = ["Put Target Hit", "Call Target Hit",
+                        "Put Stop Loss", "Call Stop Loss", "Thursday Exit"]
+        exit_conditions = [
+            # 1. Profit target (50% of premium)
+            put_px <= put_entry[:, None] * 0.5,
+            call_px <= call_entry[:, None] * 0.5,
+            # 2. Stop loss (2x premium)
+            put_px >= put_entry[:, None] * 2.0,
+            call_px >= call_entry[:, None] * 2.0,
+            # 3. Exit on Thursday (day before expiry for safety)
+            day_weekdays == 3,
+        ]
+        exit_conditions = [condition & day_valid for condition in exit_conditions]
+        exit_mask = np.logical_or.reduce(exit_conditions)
+        has_exit = exit_mask.any(axis=1)
+        exit_idx = exit_mask.argmax(axis=1)
+        rows = np.arange(n_cycles)
+        cycle_reasons = np.select([condition[rows, exit_idx] for condition in exit_conditions],
+                                  exit_reasons, default="Expiry")
+        
+        # If no exit, close at expiry
+        exit_days = trading_days[day_positions[rows, exit_idx]].astype(str)
+        exit_dates = np.where(has_exit, exit_days, expiry_dates)
+        settled = expiry_positions >= 0
+        exit_spots = entry_spots.copy()
+        exit_spots[settled] = close_arr[expiry_positions[settled]]
+        put_exit = np.where(has_exit, put_px[rows, exit_idx],
+                            np.maximum(0, put_strikes - exit_spots))
+        call_exit = np.where(has_exit, call_px[rows, exit_idx],
+                             np.maximum(0, exit_spots - call_strikes))
+        
+        # Skip if premiums too low (₹20 minimum for realistic trading)
+        traded = (put_entry >= 20) & (call_entry >= 20)
+        trades_skipped = int((~traded).sum())
+        
+        for i in np.flatnonzero(attempts <= 3):  # Debug first few
+            if traded[i]:
+                print(f"    Trade {attempts[i]}: Entry={entry_dates[i]}, Spot=₹{entry_spots[i]:.0f}, Put=₹{put_entry[i]:.0f}, Call=₹{call_entry[i]:.0f}")
+            else:
+                print(f"    Skipped {entry_dates[i]}: Put=₹{put_entry[i]:.0f}, Call=₹{call_entry[i]:.0f}")
+        
+        # Pass 4: settle and record all trades column-wise
+        put_entry, call_entry = put_entry[traded], call_entry[traded]
+        put_exit, call_exit = put_exit[traded], call_exit[traded]
+        
+        # Calculate P&L
+        put_pnl = (put_entry - put_exit) * lot_size
+        call_pnl = (call_entry - call_exit) * lot_size
+        total_pnl = put_pnl + call_pnl
+        
+        columns = self._trade_cols
+        columns["entry_date"].extend(entry_dates[traded].tolist())
+        columns["exit_date"].extend(exit_dates[traded].tolist())
+        columns["symbol"].extend([symbol_name] * len(total_pnl))
+        columns["put_strike"].extend(put_strikes[traded].tolist())
+        columns["call_strike"].extend(call_strikes[traded].tolist())
+        columns["put_entry_premium"].extend(put_entry.tolist())
+        columns["call_entry_premium"].extend(call_entry.tolist())
+        columns["put_exit_premium"].extend(put_exit.tolist())
+        columns["call_exit_premium"].extend(call_exit.tolist())
+        columns["put_pnl"].extend(put_pnl.tolist())
+        columns["call_pnl"].extend(call_pnl.tolist())
+        columns["total_pnl"].extend(total_pnl.tolist())
+        columns["exit_reason"].extend(cycle_reasons[traded].tolist())
+        
+        # Update capital
+        capital = self.capital + np.cumsum(total_pnl)
+        if len(capital):
+            self.capital = capital[-1]
+        self._eq_date.extend(exit_dates[traded].tolist())
+        self._eq_cap.extend(capital.tolist())
+        self._eq_pnl.extend(total_pnl.tolist())
         
         return self.generate_report()
     
     def generate_report(self) -> Dict:
         """Generate backtest performance report."""
-        if not self.trades:
+        if not self._trade_cols["total_pnl"]:
             return {"error": "No trades executed"}
         
-        df_trades = pd.DataFrame(self.trades)
+        pnl = np.asarray(self._trade_cols["total_pnl"], dtype=np.float64)
+        win_mask = pnl > 0
+        loss_mask = pnl < 0
         
         # Calculate metrics
-        total_trades = len(df_trades)
-        winners = len(df_trades[df_trades['total_pnl'] > 0])
-        losers = len(df_trades[df_trades['total_pnl'] < 0])
+        total_trades = len(pnl)
+        winners = int(win_mask.sum())
+        losers = int(loss_mask.sum())
         win_rate = (winners / total_trades * 100) if total_trades > 0 else 0
         
-        total_pnl = df_trades['total_pnl'].sum()
-        avg_win = df_trades[df_trades['total_pnl'] > 0]['total_pnl'].mean() if winners > 0 else 0
-        avg_loss = df_trades[df_trades['total_pnl'] < 0]['total_pnl'].mean() if losers > 0 else 0
+        total_pnl = pnl.sum()
+        avg_win = pnl[win_mask].mean() if winners > 0 else 0
+        avg_loss = pnl[loss_mask].mean() if losers > 0 else 0
         
-        max_win = df_trades['total_pnl'].max()
-        max_loss = df_trades['total_pnl'].min()
+        max_win = pnl.max()
+        max_loss = pnl.min()
         
         # Calculate drawdown
-        equity_df = pd.DataFrame(self.equity_curve)
-        equity_df['peak'] = equity_df['capital'].cummax()
-        equity_df['drawdown'] = (equity_df['capital'] - equity_df['peak']) / equity_df['peak'] * 100
-        max_drawdown = equity_df['drawdown'].min()
+        capital = np.asarray(self._eq_cap, dtype=np.float64)
+        peak = np.maximum.accumulate(capital)
+        max_drawdown = ((capital - peak) / peak * 100).min()
         
         final_capital = self.capital
         total_return = ((final_capital - self.initial_capital) / self.initial_capital) * 100
@@ -366,35 +544,54 @@ class FnOBacktester:
             "final_capital": round(final_capital, 2),
             "total_return_pct": round(total_return, 2),
             "max_drawdown_pct": round(max_drawdown, 2),
-            "trades": df_trades.to_dict('records')
+            "trades": pd.DataFrame(self._trade_cols).to_dict('records')
         }
 
 
-def main():
-    """Run backtest."""
-    print("\n" + "=" * 60)
-    print("  F&O OPTION SELLING STRATEGY - BACKTEST")
-    print("=" * 60)
-    
-    backtester = FnOBacktester(initial_capital=100000)
-    
-    # Backtest Nifty 50
-    print("\n📊 NIFTY 50 - 1 Year Backtest")
-    print("-" * 60)
+def run_backtest(symbol: str, start_date: str, end_date: str, otm_pct: float,
+                 initial_capital: float = 100000) -> Dict:
+    """
+    Run one backtest on a fresh backtester.
     
-    end_date = datetime.now().strftime("%Y-%m-%d")
-    start_date = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
-    
-    results = backtester.backtest_weekly_option_selling(
-        symbol="^NSEI",
+    Module-level so it can be shipped to worker processes; each run owns its
+    own FnOBacktester state and shares only the on-disk data cache.
+    """
+    backtester = FnOBacktester(initial_capital=initial_capital)
+    return backtester.backtest_weekly_option_selling(
+        symbol=symbol,
         start_date=start_date,
         end_date=end_date,
-        otm_pct=0.10  # 10% OTM for better premiums
+        otm_pct=otm_pct
     )
+
+
+def run_backtests_parallel(configs: List[tuple], start_date: str, end_date: str,
+                           max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    Run independent backtests across CPU cores.
     
-    # Print results
+    Args:
+        configs: List of (symbol, otm_pct) tuples
+        start_date: Start date
+        end_date: End date
+        max_workers: Worker processes (default: one per core)
+    
+    Returns:
+        Results in the same order as configs
+    """
+    # Spawn rather than fork: forking after Numba's parallel thread pool has
+    # started can deadlock the workers
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = [pool.submit(run_backtest, symbol, start_date, end_date, otm_pct)
+                   for symbol, otm_pct in configs]
+        return [future.result() for future in futures]
+
+
+def print_results(title: str, results: Dict):
+    """Print one backtest's results."""
     print("\n" + "=" * 60)
-    print("  BACKTEST RESULTS")
+    print(f"  BACKTEST RESULTS - {title}")
     print("=" * 60)
     
     if "error" in results:
@@ -421,5 +618,36 @@ def main():
         print(f"  {trade['entry_date']} → {trade['exit_date']}: ₹{trade['total_pnl']:+,.0f} ({trade['exit_reason']})")
 
 
+# (title, yfinance symbol, OTM %) - 10% OTM for better premiums
+BACKTEST_CONFIGS = [
+    ("NIFTY 50", "^NSEI", 0.10),
+    ("BANK NIFTY", "^NSEBANK", 0.10),
+]
+
+
+def main():
+    """Run backtests."""
+    print("\n" + "=" * 60)
+    print("  F&O OPTION SELLING STRATEGY - BACKTEST")
+    print("=" * 60)
+    
+    end_date = datetime.now().strftime("%Y-%m-%d")
+    start_date = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
+    
+    titles = ", ".join(title for title, _, _ in BACKTEST_CONFIGS)
+    print(f"\n📊 {titles} - 1 Year Backtest")
+    print("-" * 60)
+    
+    # Each symbol is independent, so run them in parallel processes
+    all_results = run_backtests_parallel(
+        [(symbol, otm_pct) for _, symbol, otm_pct in BACKTEST_CONFIGS],
+        start_date=start_date,
+        end_date=end_date
+    )
+    
+    for (title, _, _), results in zip(BACKTEST_CONFIGS, all_results):
+        print_results(title, results)
+
+
 if __name__ == "__main__":
     main()
@@ -2,22 +2,52 @@
 Configuration settings for F&O Trading Agent
 """
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
-load_dotenv()
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Settings read from the environment (and .env), parsed once."""
+    kite_api_key: str
+    kite_access_token: str
+    telegram_bot_token: str
+    telegram_chat_id: str
+    capital: float
+    risk_per_trade: float
+    max_positions: int
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load .env and parse environment settings on first call; cached after."""
+    load_dotenv()
+    return Settings(
+        kite_api_key=os.getenv("KITE_API_KEY", ""),
+        kite_access_token=os.getenv("KITE_ACCESS_TOKEN", ""),
+        telegram_bot_token=os.getenv("TELEGRAM_BOT_TOKEN", ""),
+        telegram_chat_id=os.getenv("TELEGRAM_CHAT_ID", ""),
+        capital=float(os.getenv("CAPITAL", "100000")),
+        risk_per_trade=float(os.getenv("RISK_PER_TRADE", "0.02")),
+        max_positions=int(os.getenv("MAX_POSITIONS", "2")),
+    )
+
+
+_settings = get_settings()
 
 # Kite Connect API
-KITE_API_KEY = os.getenv("KITE_API_KEY", "")
-KITE_ACCESS_TOKEN = os.getenv("KITE_ACCESS_TOKEN", "")
+KITE_API_KEY = _settings.kite_api_key
+KITE_ACCESS_TOKEN = _settings.kite_access_token
 
 # Telegram Bot
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+TELEGRAM_BOT_TOKEN = _settings.telegram_bot_token
+TELEGRAM_CHAT_ID = _settings.telegram_chat_id
 
 # Trading Configuration
-CAPITAL = float(os.getenv("CAPITAL", "100000"))
-RISK_PER_TRADE = float(os.getenv("RISK_PER_TRADE", "0.02"))
-MAX_POSITIONS = int(os.getenv("MAX_POSITIONS", "2"))
+CAPITAL = _settings.capital
+RISK_PER_TRADE = _settings.risk_per_trade
+MAX_POSITIONS = _settings.max_positions
 
 # Strategy Parameters
 STRATEGY = "weekly_option_selling"
@@ -34,6 +64,14 @@ ENTRY_DAY = "Monday"
 ENTRY_TIME = "09:30"
 EXIT_DAYS = ["Thursday", "Friday"]
 SCAN_INTERVAL_SECONDS = 300  # 5 minutes
+SPOT_CACHE_SECONDS = SCAN_INTERVAL_SECONDS / 4  # Reuse a spot quote within one scan cycle
+MARKET_OPEN_TIME = "09:15"  # NSE cash/F&O session, IST
+MARKET_CLOSE_TIME = "15:30"
 
 # Database
 DB_PATH = "fno_trades.db"
+INSTRUMENTS_CACHE_DIR = "data/.cache"  # Per-day copy of the NFO instrument master
+
+# Backtesting
+BACKTEST_CACHE_DIR = "data/.cache"  # On-disk cache of downloaded price history
+BACKTEST_CACHE_TTL_SECONDS = 86400  # Refresh ranges that include today after 1 day
@@ -2,10 +2,10 @@
 Paper trading execution for F&O options
 Simulates option trades without real money
 """
-from typing import Dict
+from typing import Dict, List
 from datetime import datetime
 from risk.fno_risk_manager import FnORiskManager
-from utils.telegram import send_entry_signal, send_exit_signal
+from utils.telegram import send_entry_signal, send_batch_exit_signal
 
 
 class PaperTrader:
@@ -25,53 +25,65 @@ class PaperTrader:
         Returns:
             True if trade executed successfully
         """
+        return self.execute_trades([signal]) == 1
+    
+    def execute_trades(self, signals: List[Dict]) -> int:
+        """
+        Execute a batch of paper trades, recording the approved ones together.
+        
+        Args:
+            signals: Trade signals with all parameters
+        
+        Returns:
+            Number of trades executed
+        """
         # Get lot size from signal or use default
-        lot_size = signal.get("lot_size", self._get_lot_size(signal["symbol"]))
+        trades = [
+            {**signal, "lot_size": signal.get("lot_size", self._get_lot_size(signal["symbol"]))}
+            for signal in signals
+        ]
         
         # Check risk approval
-        approval = self.risk_mgr.approve_trade(
-            symbol=signal["symbol"],
-            option_type=signal["option_type"],
-            strike=signal["strike"],
-            premium=signal["premium"],
-            lot_size=lot_size
-        )
+        approved = []
+        for trade, approval in zip(trades, self.risk_mgr.approve_trades(trades)):
+            if approval["approved"]:
+                approved.append((trade, approval))
+            else:
+                print(f"  ❌ Trade rejected: {approval['reason']}")
         
-        if not approval["approved"]:
-            print(f"  ❌ Trade rejected: {approval['reason']}")
-            return False
-        
-        # Record trade
-        trade_params = {
-            "symbol": signal["symbol"],
-            "option_type": signal["option_type"],
-            "strike": signal["strike"],
-            "premium": signal["premium"],
-            "lot_size": lot_size,
-            "strategy": signal.get("strategy", "Weekly Option Selling"),
-            "expiry": signal.get("expiry", "")
-        }
-        
-        trade_id = self.risk_mgr.record_trade(trade_params)
-        
-        # Send Telegram notification
-        send_entry_signal(
-            symbol=signal["symbol"],
-            option_type=signal["option_type"],
-            strike=signal["strike"],
-            premium=signal["premium"],
-            lot_size=lot_size,
-            margin=approval["margin"],
-            stop_loss=approval["stop_loss"],
-            target=approval["target"],
-            expiry=signal.get("expiry", "")
-        )
+        if not approved:
+            return 0
         
-        print(f"  ✅ SELL {signal['symbol']} {signal['strike']} {signal['option_type']} @ ₹{signal['premium']:.2f}")
-        print(f"     Lot Size: {lot_size} | Margin: ₹{approval['margin']:,.0f}")
-        print(f"     SL: ₹{approval['stop_loss']:.2f} | Target: ₹{approval['target']:.2f}")
+        # Record trades
+        self.risk_mgr.record_trades_bulk([{
+            "symbol": trade["symbol"],
+            "option_type": trade["option_type"],
+            "strike": trade["strike"],
+            "premium": trade["premium"],
+            "lot_size": trade["lot_size"],
+            "strategy": trade.get("strategy", "Weekly Option Selling"),
+            "expiry": trade.get("expiry", "")
+        } for trade, _ in approved])
         
-        return True
+        for trade, approval in approved:
+            # Send Telegram notification
+            send_entry_signal(
+                symbol=trade["symbol"],
+                option_type=trade["option_type"],
+                strike=trade["strike"],
+                premium=trade["premium"],
+                lot_size=trade["lot_size"],
+                margin=approval["margin"],
+                stop_loss=approval["stop_loss"],
+                target=approval["target"],
+                expiry=trade.get("expiry", "")
+            )
+            
+            print(f"  ✅ SELL {trade['symbol']} {trade['strike']} {trade['option_type']} @ ₹{trade['premium']:.2f}")
+            print(f"     Lot Size: {trade['lot_size']} | Margin: ₹{approval['margin']:,.0f}")
+            print(f"     SL: ₹{approval['stop_loss']:.2f} | Target: ₹{approval['target']:.2f}")
+        
+        return len(approved)
     
     def monitor_positions(self, option_chain_scanner, strategy) -> list:
         """
@@ -85,7 +97,13 @@ class PaperTrader:
             List of closed positions
         """
         open_positions = self.risk_mgr.get_open_positions()
-        closed = []
+        exits = []
+        
+        # One option chain fetch per (symbol, expiry) this tick
+        chain_cache = {}
+        
+        # One clock reading for every exit check in this tick
+        now = datetime.now()
         
         for position in open_positions:
             # Get current premium
@@ -94,33 +112,39 @@ class PaperTrader:
                 position["symbol"],
                 position["option_type"],
                 position["strike"],
-                position["expiry"]
+                position["expiry"],
+                chain_cache
             )
             
             if current_premium is None:
                 continue
             
             # Check exit conditions
-            should_exit, reason = strategy.should_exit(position, current_premium)
+            should_exit, reason = strategy.should_exit(position, current_premium, now)
             
             if should_exit:
-                # Close position
-                pnl = self.risk_mgr.close_trade(
-                    position["id"],
-                    current_premium,
-                    reason
-                )
-                
-                # Send exit notification
-                send_exit_signal(
-                    symbol=position["symbol"],
-                    option_type=position["option_type"],
-                    strike=position["strike"],
-                    entry_premium=position["entry_premium"],
-                    exit_premium=current_premium,
-                    pnl=pnl,
-                    reason=reason
-                )
+                exits.append((position, current_premium, reason))
+        
+        # Close all exiting positions in one transaction
+        pnls = self.risk_mgr.close_trades_bulk(
+            [(position["id"], current_premium, reason)
+             for position, current_premium, reason in exits]
+        )
+        
+        closed = []
+        exit_signals = []
+        for (position, current_premium, reason), pnl in zip(exits, pnls):
+            if pnl is not None:
+                # Queue exit notification
+                exit_signals.append({
+                    "symbol": position["symbol"],
+                    "option_type": position["option_type"],
+                    "strike": position["strike"],
+                    "entry_premium": position["entry_premium"],
+                    "exit_premium": current_premium,
+                    "pnl": pnl,
+                    "reason": reason
+                })
                 
                 closed.append({
                     "symbol": position["symbol"],
@@ -134,13 +158,22 @@ class PaperTrader:
                 print(f"     Entry: ₹{position['entry_premium']:.2f} | Exit: ₹{current_premium:.2f}")
                 print(f"     P&L: ₹{pnl:+,.0f} | Reason: {reason}")
         
+        # Send all exit notifications in one message
+        send_batch_exit_signal(exit_signals)
+        
         return closed
     
     def _get_current_premium(self, scanner, symbol: str, option_type: str,
-                            strike: float, expiry: str) -> float:
-        """Get current premium for an option."""
+                            strike: float, expiry: str, chain_cache: Dict = None) -> float:
+        """Get current premium for an option, reusing chains from chain_cache if given."""
         try:
-            option_chain = scanner.get_option_chain(symbol, expiry)
+            key = (symbol, expiry)
+            if chain_cache is not None and key in chain_cache:
+                option_chain = chain_cache[key]
+            else:
+                option_chain = scanner.get_option_chain(symbol, expiry)
+                if chain_cache is not None:
+                    chain_cache[key] = option_chain
             if strike in option_chain[option_type]:
                 return option_chain[option_type][strike]["ltp"]
         except Exception as e:
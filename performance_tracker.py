@@ -2,13 +2,70 @@
 Performance Tracker for F&O Trading Agent
 Provides detailed P&L tracking and reporting
 """
+import atexit
+import io
 import sqlite3
-import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from config.settings import DB_PATH
+from utils.db import PAISA, check_query_plans, connect, init_schema, transaction
 from utils.telegram import send_telegram_message
 
+_SQL_OVERALL = """
+    SELECT total, winners, losers, total_pnl_p, max_win_p, min_loss_p, open_count
+    FROM fno_stats
+    WHERE id = 1
+"""
+
+_SQL_RECENT = """
+    SELECT 
+        entry_time, exit_time, symbol, option_type,
+        strike_p / 100.0 as strike,
+        entry_premium_p / 100.0 as entry_premium,
+        exit_premium_p / 100.0 as exit_premium,
+        lot_size,
+        pnl_p / 100.0 as pnl,
+        exit_reason, status
+    FROM fno_trades
+    ORDER BY entry_time DESC
+    LIMIT ?
+"""
+
+_SQL_DAILY = """
+    SELECT 
+        DATE(exit_time) as date,
+        COUNT(*) as trades,
+        SUM(pnl_p) / 100.0 as daily_pnl,
+        SUM(CASE WHEN pnl_p > 0 THEN 1 ELSE 0 END) as wins,
+        SUM(CASE WHEN pnl_p < 0 THEN 1 ELSE 0 END) as losses
+    FROM fno_trades
+    WHERE status = 'CLOSED' 
+        AND exit_time >= date('now', '-' || ? || ' days')
+    GROUP BY DATE(exit_time)
+    ORDER BY date DESC
+"""
+
+_SQL_SYMBOL = """
+    SELECT 
+        symbol,
+        COUNT(*) as trades,
+        SUM(pnl_p) / 100.0 as total_pnl,
+        AVG(pnl_p) / 100.0 as avg_pnl,
+        SUM(CASE WHEN pnl_p > 0 THEN 1 ELSE 0 END) as wins,
+        SUM(CASE WHEN pnl_p < 0 THEN 1 ELSE 0 END) as losses
+    FROM fno_trades
+    WHERE status = 'CLOSED'
+    GROUP BY symbol
+    ORDER BY total_pnl DESC
+"""
+
+# Static report text, written as-is into the report buffer
+_REPORT_HEADER = "📊 *F&O PERFORMANCE REPORT*\n\n*Overall Performance:*\n"
+_REPORT_RECENT = "*Last 5 Trades:*\n"
+_REPORT_DAILY = "*Last 7 Days P&L:*\n"
+_REPORT_SYMBOLS = "*By Symbol:*\n"
+_RULE = "=" * 60
+
 
 class PerformanceTracker:
     """Track and report F&O trading performance."""
@@ -16,195 +73,135 @@ class PerformanceTracker:
     def __init__(self, db_path: str = DB_PATH):
         """Initialize performance tracker."""
         self.db_path = db_path
+        self._conn = connect(self.db_path)
+        atexit.register(self.close)
+        init_schema(self._conn)
+        check_query_plans(self._conn, {
+            "recent trades": (_SQL_RECENT, (10,)),
+            "daily P&L": (_SQL_DAILY, (30,)),
+            "symbol breakdown": (_SQL_SYMBOL, ()),
+        })
+    
+    def close(self):
+        """Close the database connection (safe to call more than once)."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
     
     def get_overall_pnl(self) -> Dict:
         """Get overall P&L summary."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Overall stats and open positions, from the running aggregates
+        row = self._conn.execute(_SQL_OVERALL).fetchone()
         
-        # Overall stats
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_trades,
-                SUM(CASE WHEN pnl > 0 THEN 1 ELSE 0 END) as winners,
-                SUM(CASE WHEN pnl < 0 THEN 1 ELSE 0 END) as losers,
-                SUM(pnl) as total_pnl,
-                AVG(pnl) as avg_pnl,
-                MAX(pnl) as max_win,
-                MIN(pnl) as min_loss
-            FROM fno_trades
-            WHERE status = 'CLOSED'
-        """)
-        
-        row = cursor.fetchone()
-        
-        total_trades = row[0] if row[0] else 0
-        winners = row[1] if row[1] else 0
-        losers = row[2] if row[2] else 0
-        total_pnl = row[3] if row[3] else 0
-        avg_pnl = row[4] if row[4] else 0
-        max_win = row[5] if row[5] else 0
-        min_loss = row[6] if row[6] else 0
+        total_trades, winners, losers = row[:3]
+        total_pnl = row[3] / PAISA if row[3] else 0
+        avg_pnl = total_pnl / total_trades if total_trades > 0 else 0
+        max_win = row[4] / PAISA if row[4] else 0
+        min_loss = row[5] / PAISA if row[5] else 0
+        open_positions = row[6]
         
         win_rate = (winners / total_trades * 100) if total_trades > 0 else 0
         
-        # Open positions
-        cursor.execute("SELECT COUNT(*) FROM fno_trades WHERE status = 'OPEN'")
-        open_positions = cursor.fetchone()[0]
-        
-        conn.close()
-        
         return {
             "total_trades": total_trades,
             "winners": winners,
             "losers": losers,
             "win_rate": round(win_rate, 1),
-            "total_pnl": round(total_pnl, 2),
+            "total_pnl": total_pnl,
             "avg_pnl": round(avg_pnl, 2),
-            "max_win": round(max_win, 2),
-            "max_loss": round(min_loss, 2),
+            "max_win": max_win,
+            "max_loss": min_loss,
             "open_positions": open_positions
         }
     
     def get_recent_trades(self, limit: int = 10) -> List[Dict]:
         """Get recent trades with details."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                entry_time, exit_time, symbol, option_type, strike,
-                entry_premium, exit_premium, lot_size, pnl, exit_reason, status
-            FROM fno_trades
-            ORDER BY entry_time DESC
-            LIMIT ?
-        """, (limit,))
-        
-        trades = []
-        for row in cursor.fetchall():
-            trades.append({
-                "entry_time": row[0],
-                "exit_time": row[1],
-                "symbol": row[2],
-                "option_type": row[3],
-                "strike": row[4],
-                "entry_premium": row[5],
-                "exit_premium": row[6],
-                "lot_size": row[7],
-                "pnl": row[8],
-                "exit_reason": row[9],
-                "status": row[10]
-            })
-        
-        conn.close()
-        return trades
+        return [dict(row) for row in self._recent_rows(limit)]
     
-    def get_daily_pnl(self, days: int = 30) -> pd.DataFrame:
-        """Get daily P&L for the last N days."""
-        conn = sqlite3.connect(self.db_path)
-        
-        query = """
-            SELECT 
-                DATE(exit_time) as date,
-                COUNT(*) as trades,
-                SUM(pnl) as daily_pnl,
-                SUM(CASE WHEN pnl > 0 THEN 1 ELSE 0 END) as wins,
-                SUM(CASE WHEN pnl < 0 THEN 1 ELSE 0 END) as losses
-            FROM fno_trades
-            WHERE status = 'CLOSED' 
-                AND exit_time >= date('now', '-{} days')
-            GROUP BY DATE(exit_time)
-            ORDER BY date DESC
-        """.format(days)
-        
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        return df
+    def _recent_rows(self, limit: int) -> List[sqlite3.Row]:
+        """Recent trades as sqlite3.Row (by column name, or unpacked in column order)."""
+        # sqlite3.Row is built in C and keyed by the selected column names
+        cursor = self._conn.execute(_SQL_RECENT, (limit,))
+        cursor.row_factory = sqlite3.Row
+        return cursor.fetchall()
     
-    def get_symbol_breakdown(self) -> pd.DataFrame:
-        """Get P&L breakdown by symbol."""
-        conn = sqlite3.connect(self.db_path)
-        
-        query = """
-            SELECT 
-                symbol,
-                COUNT(*) as trades,
-                SUM(pnl) as total_pnl,
-                AVG(pnl) as avg_pnl,
-                SUM(CASE WHEN pnl > 0 THEN 1 ELSE 0 END) as wins,
-                SUM(CASE WHEN pnl < 0 THEN 1 ELSE 0 END) as losses
-            FROM fno_trades
-            WHERE status = 'CLOSED'
-            GROUP BY symbol
-            ORDER BY total_pnl DESC
+    def get_daily_pnl(self, days: int = 30) -> List[Tuple]:
         """
+        Get daily P&L for the last N days.
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        if not df.empty:
-            df['win_rate'] = (df['wins'] / df['trades'] * 100).round(1)
+        Returns:
+            List of (date, trades, daily_pnl, wins, losses) tuples, newest first
+        """
+        return self._conn.execute(_SQL_DAILY, (days,)).fetchall()
+    
+    def get_symbol_breakdown(self) -> List[Tuple]:
+        """
+        Get P&L breakdown by symbol.
         
-        return df
+        Returns:
+            List of (symbol, trades, total_pnl, avg_pnl, wins, losses, win_rate)
+            tuples, best total P&L first
+        """
+        return [
+            (symbol, trades, total_pnl, avg_pnl, wins, losses, round(wins / trades * 100, 1))
+            for symbol, trades, total_pnl, avg_pnl, wins, losses
+            in self._conn.execute(_SQL_SYMBOL).fetchall()
+        ]
     
     def generate_performance_report(self) -> str:
         """Generate detailed performance report."""
-        overall = self.get_overall_pnl()
-        recent = self.get_recent_trades(5)
-        daily = self.get_daily_pnl(7)
-        symbols = self.get_symbol_breakdown()
+        # All four sections read one snapshot in a single read transaction
+        with transaction(self._conn, "DEFERRED"):
+            overall = self.get_overall_pnl()
+            recent = self._recent_rows(5)
+            daily = self.get_daily_pnl(7)
+            symbols = self.get_symbol_breakdown()
         
-        report = []
-        report.append("📊 *F&O PERFORMANCE REPORT*\n")
+        buf = io.StringIO()
+        w = buf.write
         
         # Overall stats
-        report.append("*Overall Performance:*")
-        report.append(f"Total Trades: {overall['total_trades']}")
-        report.append(f"Win Rate: {overall['win_rate']}%")
-        report.append(f"Total P&L: ₹{overall['total_pnl']:+,.0f}")
-        report.append(f"Avg P&L: ₹{overall['avg_pnl']:+,.0f}")
-        report.append(f"Max Win: ₹{overall['max_win']:,.0f}")
-        report.append(f"Max Loss: ₹{overall['max_loss']:,.0f}")
-        report.append(f"Open Positions: {overall['open_positions']}\n")
+        w(_REPORT_HEADER)
+        w(
+            f"Total Trades: {overall['total_trades']}\n"
+            f"Win Rate: {overall['win_rate']}%\n"
+            f"Total P&L: ₹{overall['total_pnl']:+,.0f}\n"
+            f"Avg P&L: ₹{overall['avg_pnl']:+,.0f}\n"
+            f"Max Win: ₹{overall['max_win']:,.0f}\n"
+            f"Max Loss: ₹{overall['max_loss']:,.0f}\n"
+            f"Open Positions: {overall['open_positions']}\n\n"
+        )
         
         # Recent trades
         if recent:
-            report.append("*Last 5 Trades:*")
-            for trade in recent[:5]:
-                status_emoji = "✅" if trade['pnl'] and trade['pnl'] > 0 else "❌" if trade['pnl'] and trade['pnl'] < 0 else "🔄"
-                if trade['status'] == 'CLOSED':
-                    report.append(
-                        f"{status_emoji} {trade['symbol']} {trade['strike']} {trade['option_type']}: "
-                        f"₹{trade['pnl']:+,.0f} ({trade['exit_reason']})"
-                    )
+            w(_REPORT_RECENT)
+            # Unpacked in _SQL_RECENT column order, like the sections below
+            for (_, _, symbol, option_type, strike, entry_premium, _, _,
+                 pnl, exit_reason, status) in recent:
+                if status == 'CLOSED':
+                    status_emoji = "✅" if pnl and pnl > 0 else "❌" if pnl and pnl < 0 else "🔄"
+                    w(f"{status_emoji} {symbol} {strike} {option_type}: "
+                      f"₹{pnl:+,.0f} ({exit_reason})\n")
                 else:
-                    report.append(
-                        f"🔄 {trade['symbol']} {trade['strike']} {trade['option_type']}: "
-                        f"OPEN @ ₹{trade['entry_premium']:.0f}"
-                    )
-            report.append("")
+                    w(f"🔄 {symbol} {strike} {option_type}: "
+                      f"OPEN @ ₹{entry_premium:.0f}\n")
+            w("\n")
         
         # Daily P&L (last 7 days)
-        if not daily.empty:
-            report.append("*Last 7 Days P&L:*")
-            for _, row in daily.iterrows():
-                report.append(
-                    f"{row['date']}: ₹{row['daily_pnl']:+,.0f} "
-                    f"({row['wins']}W/{row['losses']}L)"
-                )
-            report.append("")
+        if daily:
+            w(_REPORT_DAILY)
+            for date, _, daily_pnl, wins, losses in daily:
+                w(f"{date}: ₹{daily_pnl:+,.0f} ({wins}W/{losses}L)\n")
+            w("\n")
         
         # Symbol breakdown
-        if not symbols.empty:
-            report.append("*By Symbol:*")
-            for _, row in symbols.iterrows():
-                report.append(
-                    f"{row['symbol']}: ₹{row['total_pnl']:+,.0f} "
-                    f"({row['win_rate']:.0f}% WR, {row['trades']} trades)"
-                )
+        if symbols:
+            w(_REPORT_SYMBOLS)
+            for symbol, trades, total_pnl, _, _, _, win_rate in symbols:
+                w(f"{symbol}: ₹{total_pnl:+,.0f} ({win_rate:.0f}% WR, {trades} trades)\n")
         
-        return "\n".join(report)
+        # Every line was written with a newline; the report has none at the end
+        return buf.getvalue().removesuffix("\n")
     
     def send_performance_update(self):
         """Send performance update via Telegram."""
@@ -215,19 +212,22 @@ class PerformanceTracker:
         """Print performance summary to console."""
         overall = self.get_overall_pnl()
         
-        print("\n" + "=" * 60)
-        print("  F&O PERFORMANCE SUMMARY")
-        print("=" * 60)
-        print(f"  Total Trades:     {overall['total_trades']}")
-        print(f"  Winners:          {overall['winners']}")
-        print(f"  Losers:           {overall['losers']}")
-        print(f"  Win Rate:         {overall['win_rate']}%")
-        print(f"  Total P&L:        ₹{overall['total_pnl']:+,.0f}")
-        print(f"  Avg P&L:          ₹{overall['avg_pnl']:+,.0f}")
-        print(f"  Max Win:          ₹{overall['max_win']:,.0f}")
-        print(f"  Max Loss:         ₹{overall['max_loss']:,.0f}")
-        print(f"  Open Positions:   {overall['open_positions']}")
-        print("=" * 60 + "\n")
+        # One encode and one write for the whole block
+        print(
+            f"\n{_RULE}\n"
+            "  F&O PERFORMANCE SUMMARY\n"
+            f"{_RULE}\n"
+            f"  Total Trades:     {overall['total_trades']}\n"
+            f"  Winners:          {overall['winners']}\n"
+            f"  Losers:           {overall['losers']}\n"
+            f"  Win Rate:         {overall['win_rate']}%\n"
+            f"  Total P&L:        ₹{overall['total_pnl']:+,.0f}\n"
+            f"  Avg P&L:          ₹{overall['avg_pnl']:+,.0f}\n"
+            f"  Max Win:          ₹{overall['max_win']:,.0f}\n"
+            f"  Max Loss:         ₹{overall['max_loss']:,.0f}\n"
+            f"  Open Positions:   {overall['open_positions']}\n"
+            f"{_RULE}\n"
+        )
 
 
 def main():
@@ -238,11 +238,11 @@ def main():
     tracker.print_performance_summary()
     
     # Show recent trades
-    print("Recent Trades:")
-    recent = tracker.get_recent_trades(10)
-    for trade in recent:
+    lines = ["Recent Trades:"]
+    for trade in tracker.get_recent_trades(10):
         status = "OPEN" if trade['status'] == 'OPEN' else f"₹{trade['pnl']:+,.0f}"
-        print(f"  {trade['entry_time'][:10]} | {trade['symbol']} {trade['strike']} {trade['option_type']} | {status}")
+        lines.append(f"  {trade['entry_time'][:10]} | {trade['symbol']} {trade['strike']} {trade['option_type']} | {status}")
+    print("\n".join(lines))
     
     # Send to Telegram
     print("\nSending performance report to Telegram...")
@@ -2,10 +2,86 @@
 Risk management for F&O trading
 Handles position sizing, margin tracking, and risk limits
 """
-import sqlite3
-from datetime import datetime
-from typing import Dict, Optional
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
 from config.settings import CAPITAL, RISK_PER_TRADE, MAX_POSITIONS, DB_PATH
+from utils.db import (
+    PAISA, check_query_plans, connect, init_schema, rebuild_stats, to_paisa, transaction
+)
+
+_SQL_OPEN_POSITIONS = """
+    SELECT id, symbol, option_type, strike_p / 100.0, entry_premium_p / 100.0, lot_size,
+           entry_time, strategy, expiry
+    FROM fno_trades
+    WHERE status = 'OPEN'
+"""
+
+_SQL_INSERT_TRADE = """
+    INSERT INTO fno_trades 
+    (symbol, option_type, strike_p, entry_premium_p, lot_size, entry_time, 
+     status, strategy, expiry)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING id
+"""
+
+_SQL_TRADE_ENTRY = """
+    SELECT entry_premium_p, lot_size
+    FROM fno_trades
+    WHERE id = ?
+"""
+
+_SQL_CLOSE_TRADE = """
+    UPDATE fno_trades
+    SET exit_premium_p = ?, exit_time = ?, pnl_p = ?, 
+        status = 'CLOSED', exit_reason = ?
+    WHERE id = ?
+"""
+
+_SQL_STATS_OPENED = "UPDATE fno_stats SET open_count = open_count + ? WHERE id = 1"
+
+_SQL_STATS_CLOSED = """
+    UPDATE fno_stats
+    SET total = total + 1,
+        winners = winners + (:pnl > 0),
+        losers = losers + (:pnl < 0),
+        total_pnl_p = total_pnl_p + :pnl,
+        max_win_p = CASE WHEN max_win_p IS NULL OR :pnl > max_win_p THEN :pnl ELSE max_win_p END,
+        min_loss_p = CASE WHEN min_loss_p IS NULL OR :pnl < min_loss_p THEN :pnl ELSE min_loss_p END,
+        open_count = open_count - 1
+    WHERE id = 1
+"""
+
+_SQL_SUMMARY = "SELECT total, winners, losers, total_pnl_p FROM fno_stats WHERE id = 1"
+
+# The writer thread commits everything queued within this long of the first
+# write in one transaction, up to this many writes
+_WRITE_BATCH_SECONDS = 0.05
+_WRITE_BATCH_MAX = 64
+
+log = logging.getLogger("fno.risk")
+
+
+class _Reply:
+    """Outcome of a queued write, for a caller that waits on it."""
+    
+    __slots__ = ("done", "result", "error")
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+    
+    def wait(self):
+        """Block until the write is committed; return its result or raise its error."""
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
 
 
 class FnORiskManager:
@@ -23,34 +99,188 @@ class FnORiskManager:
         self.max_positions = max_positions
         self.risk_per_trade = RISK_PER_TRADE
         self.db_path = DB_PATH
+        self._conn = connect(self.db_path)
         self._init_db()
+        
+        # Open positions by trade id, kept in step by record_trade/close_trade
+        self._lock = threading.Lock()
+        self._open = {
+            row[0]: self._position_from_row(row)
+            for row in self._conn.execute(_SQL_OPEN_POSITIONS).fetchall()
+        }
+        
+        # Trade writes are queued and committed in batches by one writer
+        # thread on its own connection, keeping disk I/O off the scan loop
+        self._write_conn = connect(self.db_path)
+        self._write_q = queue.Queue()
+        self._write_error = None  # Unrecoverable fire-and-forget write, raised by flush()
+        self._writer = threading.Thread(target=self._drain_writes,
+                                        name="fno-trade-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
     
     def _init_db(self):
         """Initialize database for tracking trades."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS fno_trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                option_type TEXT NOT NULL,
-                strike REAL NOT NULL,
-                entry_premium REAL NOT NULL,
-                exit_premium REAL,
-                lot_size INTEGER NOT NULL,
-                entry_time TEXT NOT NULL,
-                exit_time TEXT,
-                pnl REAL,
-                status TEXT NOT NULL,
-                exit_reason TEXT,
-                strategy TEXT,
-                expiry TEXT
-            )
-        """)
+        init_schema(self._conn)
+        check_query_plans(self._conn, {
+            "open positions": (_SQL_OPEN_POSITIONS, ()),
+            "trade entry": (_SQL_TRADE_ENTRY, (0,)),
+        })
+    
+    @staticmethod
+    def _position_from_row(row: tuple) -> Dict:
+        """Build an open-position dict from an _SQL_OPEN_POSITIONS row."""
+        return {
+            "id": row[0],
+            "symbol": row[1],
+            "option_type": row[2],
+            "strike": row[3],
+            "entry_premium": row[4],
+            "lot_size": row[5],
+            "entry_time": row[6],
+            "strategy": row[7],
+            "expiry": row[8],
+            # Parsed once here so exit checks don't re-parse it every tick
+            "expiry_date": date.fromisoformat(row[8]) if row[8] else None,
+            "stop_loss": row[4] * 2.0,
+            "target": row[4] * 0.5
+        }
+    
+    def close(self):
+        """Commit queued writes and close the database (safe to call more than once)."""
+        if self._conn is not None:
+            self._write_q.put(None)  # Stops the writer once the queue is drained
+            self._writer.join()
+            
+            # Anything queued after the stop marker will never be written
+            while True:
+                try:
+                    item = self._write_q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and item[2] is not None:
+                    if item[0] is not None:
+                        item[2].error = RuntimeError("Risk manager closed before the write")
+                    item[2].done.set()
+            
+            self._write_conn.close()
+            self._conn.close()
+            self._conn = None
+    
+    def flush(self):
+        """
+        Block until every trade write queued so far is committed.
         
-        conn.commit()
-        conn.close()
+        Returns at once after close(). Raises RuntimeError if a queued
+        write failed even when retried on its own (it is logged too).
+        """
+        if self._writer.is_alive():
+            self._submit(None, ()).wait()
+        
+        error, self._write_error = self._write_error, None
+        if error is not None:
+            raise RuntimeError("A queued trade write failed; see the fno.risk log") from error
+    
+    def _submit(self, write, args: tuple, wait: bool = True) -> Optional[_Reply]:
+        """
+        Queue a write for the writer thread.
+        
+        Args:
+            write: Writer-thread method to call, or None for a flush marker
+            args: Arguments for write
+            wait: Return a _Reply to wait on (ends the current batch early)
+        
+        Returns:
+            The _Reply, or None when wait is False
+        """
+        if not self._writer.is_alive():
+            raise RuntimeError("Risk manager is closed")
+        reply = _Reply() if wait else None
+        self._write_q.put((write, args, reply))
+        return reply
+    
+    def _drain_writes(self):
+        """
+        Writer thread: commit queued writes in batches until close().
+        
+        Queue items are (method, args, reply) writes, where method None is
+        a flush marker and reply is set once the item is committed, or
+        None to stop.
+        """
+        while True:
+            batch = [self._write_q.get()]
+            deadline = time.monotonic() + _WRITE_BATCH_SECONDS
+            
+            # Gather more writes; a waiting caller or stop marker ends the batch early
+            while len(batch) < _WRITE_BATCH_MAX and batch[-1] is not None and batch[-1][2] is None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._write_q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            writes = [item for item in batch if item is not None and item[0] is not None]
+            if writes:
+                self._commit_writes(writes)
+            
+            for item in batch:
+                if item is not None and item[2] is not None:
+                    item[2].done.set()
+            if batch[-1] is None:
+                return
+    
+    def _commit_writes(self, writes: List[tuple]):
+        """
+        Writer thread: commit a batch in one transaction.
+        
+        If the batch fails, each write is retried in its own transaction so
+        one bad write can't take the rest down with it. A write that still
+        fails is logged and its error handed to the waiting caller, or kept
+        for the next flush() to raise.
+        """
+        if len(writes) > 1:
+            try:
+                with transaction(self._write_conn):
+                    results = [write(*args) for write, args, _ in writes]
+            except Exception:
+                log.exception("Batch of %d trade writes failed; retrying one at a time",
+                              len(writes))
+            else:
+                for (_, _, reply), result in zip(writes, results):
+                    if reply is not None:
+                        reply.result = result
+                return
+        
+        for write, args, reply in writes:
+            try:
+                with transaction(self._write_conn):
+                    result = write(*args)
+            except Exception as e:
+                log.exception("Trade write %s%r failed", write.__name__, args)
+                if reply is not None:
+                    reply.error = e
+                else:
+                    self._write_error = e
+            else:
+                if reply is not None:
+                    reply.result = result
+    
+    def _write_trades(self, rows: List[tuple]) -> List[int]:
+        """Writer thread: insert new trades, count them as open and return their ids."""
+        trade_ids = [self._write_conn.execute(_SQL_INSERT_TRADE, row).fetchone()[0]
+                     for row in rows]
+        self._write_conn.execute(_SQL_STATS_OPENED, (len(rows),))
+        return trade_ids
+    
+    def _write_closes(self, updates: List[tuple], stats: List[Dict], rebuild: bool):
+        """Writer thread: close trades and keep the running aggregates in step."""
+        self._write_conn.executemany(_SQL_CLOSE_TRADE, updates)
+        if rebuild:
+            rebuild_stats(self._write_conn)
+        else:
+            self._write_conn.executemany(_SQL_STATS_CLOSED, stats)
     
     def approve_trade(self, symbol: str, option_type: str, strike: float,
                      premium: float, lot_size: int) -> Dict:
@@ -67,8 +297,43 @@ class FnORiskManager:
         Returns:
             Dict with approval status and trade parameters
         """
+        open_positions, available_capital = self._open_summary()
+        return self._approve(symbol, option_type, strike, premium, lot_size,
+                             open_positions, available_capital)
+    
+    def approve_trades(self, signals: List[Dict]) -> List[Dict]:
+        """
+        Approve a batch of trades, counting earlier approvals in the batch.
+        
+        Each approved trade uses up a position slot and its margin (as
+        _open_summary will see it once recorded) before the next
+        signal is checked, exactly as if they were approved and recorded
+        one at a time.
+        
+        Args:
+            signals: Dicts with symbol, option_type, strike, premium, lot_size
+        
+        Returns:
+            One approval dict per signal, in order
+        """
+        open_positions, available_capital = self._open_summary()
+        
+        approvals = []
+        for signal in signals:
+            approval = self._approve(signal["symbol"], signal["option_type"], signal["strike"],
+                                     signal["premium"], signal["lot_size"],
+                                     open_positions, available_capital)
+            if approval["approved"]:
+                open_positions += 1
+                available_capital -= signal["premium"] * signal["lot_size"] * 0.12
+            approvals.append(approval)
+        
+        return approvals
+    
+    def _approve(self, symbol: str, option_type: str, strike: float, premium: float,
+                 lot_size: int, open_positions: int, available_capital: float) -> Dict:
+        """Apply the risk rules given the current open count and free capital."""
         # Check max positions
-        open_positions = self.get_open_positions_count()
         if open_positions >= self.max_positions:
             return {
                 "approved": False,
@@ -79,7 +344,6 @@ class FnORiskManager:
         margin = self._calculate_margin(symbol, strike, premium, lot_size)
         
         # Check if we have enough capital
-        available_capital = self._get_available_capital()
         if margin > available_capital:
             return {
                 "approved": False,
@@ -123,153 +387,164 @@ class FnORiskManager:
         
         return round(margin, 2)
     
-    def _get_available_capital(self) -> float:
-        """Calculate available capital after accounting for open positions."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get total margin used by open positions
-        cursor.execute("""
-            SELECT SUM(entry_premium * lot_size * 0.12) as used_margin
-            FROM fno_trades
-            WHERE status = 'OPEN'
-        """)
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        used_margin = result[0] if result[0] else 0
-        return self.capital - used_margin
+    def _open_summary(self) -> Tuple[int, float]:
+        """
+        Open position count and the capital left after their margin.
+        
+        Served from the in-memory open positions, so approvals never touch
+        the database. Margin is summed in paisa like the stored premiums.
+        
+        Returns:
+            (open_positions, available_capital)
+        """
+        with self._lock:
+            used_margin_p = sum(
+                to_paisa(position["entry_premium"]) * position["lot_size"]
+                for position in self._open.values()
+            )
+            return len(self._open), self.capital - used_margin_p * 0.12 / PAISA
     
     def get_open_positions_count(self) -> int:
         """Get count of open positions."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM fno_trades WHERE status = 'OPEN'")
-        count = cursor.fetchone()[0]
-        
-        conn.close()
-        return count
+        with self._lock:
+            return len(self._open)
     
     def get_open_positions(self) -> list:
-        """Get all open positions."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, symbol, option_type, strike, entry_premium, lot_size,
-                   entry_time, strategy, expiry
-            FROM fno_trades
-            WHERE status = 'OPEN'
-        """)
-        
-        positions = []
-        for row in cursor.fetchall():
-            positions.append({
-                "id": row[0],
-                "symbol": row[1],
-                "option_type": row[2],
-                "strike": row[3],
-                "entry_premium": row[4],
-                "lot_size": row[5],
-                "entry_time": row[6],
-                "strategy": row[7],
-                "expiry": row[8],
-                "stop_loss": row[4] * 2.0,
-                "target": row[4] * 0.5
-            })
-        
-        conn.close()
-        return positions
+        """Get all open positions (copies; mutating them doesn't touch the cache)."""
+        with self._lock:
+            return [dict(position) for position in self._open.values()]
     
     def record_trade(self, trade_params: Dict):
         """Record a new trade in database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO fno_trades 
-            (symbol, option_type, strike, entry_premium, lot_size, entry_time, 
-             status, strategy, expiry)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        return self.record_trades_bulk([trade_params])[0]
+    
+    def record_trades_bulk(self, trades: List[Dict]) -> List[int]:
+        """
+        Record several new trades, committed together by the writer thread.
+        
+        Waits for the insert so SQLite assigns the ids (unique even with
+        several managers on one database); the trades are open and count
+        against limits once this returns.
+        
+        Args:
+            trades: Trade parameter dicts, as accepted by record_trade
+        
+        Returns:
+            Trade ids, in the same order as trades
+        """
+        if not trades:
+            return []
+        
+        entry_time = datetime.now().isoformat()
+        
+        rows = [(
             trade_params["symbol"],
             trade_params["option_type"],
-            trade_params["strike"],
-            trade_params["premium"],
+            to_paisa(trade_params["strike"]),
+            to_paisa(trade_params["premium"]),
             trade_params["lot_size"],
-            datetime.now().isoformat(),
+            entry_time,
             "OPEN",
             trade_params.get("strategy", "Weekly Option Selling"),
             trade_params.get("expiry", "")
-        ))
+        ) for trade_params in trades]
+        
+        # Not under the lock: other callers keep going while the insert commits
+        trade_ids = self._submit(self._write_trades, (rows,)).wait()
         
-        conn.commit()
-        trade_id = cursor.lastrowid
-        conn.close()
+        with self._lock:
+            for trade_id, row in zip(trade_ids, rows):
+                symbol, option_type, strike_p, premium_p, lot_size, _, _, strategy, expiry = row
+                # Same values _SQL_OPEN_POSITIONS hands back
+                self._open[trade_id] = self._position_from_row((
+                    trade_id, symbol, option_type, strike_p / PAISA, premium_p / PAISA,
+                    lot_size, entry_time, strategy, expiry
+                ))
         
-        return trade_id
+        return trade_ids
     
     def close_trade(self, trade_id: int, exit_premium: float, exit_reason: str):
         """Close a trade and record P&L."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get trade details
-        cursor.execute("""
-            SELECT entry_premium, lot_size
-            FROM fno_trades
-            WHERE id = ?
-        """, (trade_id,))
-        
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return
-        
-        entry_premium, lot_size = row
-        
-        # Calculate P&L (for option selling)
-        pnl = (entry_premium - exit_premium) * lot_size
-        
-        # Update trade
-        cursor.execute("""
-            UPDATE fno_trades
-            SET exit_premium = ?, exit_time = ?, pnl = ?, 
-                status = 'CLOSED', exit_reason = ?
-            WHERE id = ?
-        """, (exit_premium, datetime.now().isoformat(), pnl, exit_reason, trade_id))
-        
-        conn.commit()
-        conn.close()
-        
-        return pnl
+        return self.close_trades_bulk([(trade_id, exit_premium, exit_reason)])[0]
+    
+    def close_trades_bulk(self, closes: List[Tuple[int, float, str]]) -> List[Optional[float]]:
+        """
+        Close several trades and record their P&L, committed together by
+        the writer thread.
+        
+        Args:
+            closes: (trade_id, exit_premium, exit_reason) tuples
+        
+        Returns:
+            P&L per close, in order (None for an unknown trade id)
+        """
+        if not closes:
+            return []
+        
+        exit_time = datetime.now().isoformat()
+        pnls = []
+        updates = []
+        stats = []
+        rebuild = False
+        
+        # Closed before (or unknown): read entries once queued writes land,
+        # outside the lock so other callers aren't held up meanwhile
+        with self._lock:
+            missing = {trade_id for trade_id, _, _ in closes if trade_id not in self._open}
+        entries = {}
+        if missing:
+            self.flush()
+            for trade_id in missing:
+                entries[trade_id] = self._conn.execute(_SQL_TRADE_ENTRY, (trade_id,)).fetchone()
+        
+        with self._lock:
+            seen = set()
+            for trade_id, exit_premium, exit_reason in closes:
+                # Get trade details
+                position = self._open.get(trade_id)
+                if position is not None:
+                    entry_premium_p = to_paisa(position["entry_premium"])
+                    lot_size = position["lot_size"]
+                else:
+                    if trade_id not in entries:
+                        # Closed by another caller since the check above; the
+                        # entry columns never change, so no flush is needed
+                        entries[trade_id] = self._conn.execute(_SQL_TRADE_ENTRY,
+                                                               (trade_id,)).fetchone()
+                    row = entries[trade_id]
+                    if not row:
+                        pnls.append(None)
+                        continue
+                    entry_premium_p, lot_size = row
+                
+                # Calculate P&L (for option selling), exactly in paisa
+                exit_premium_p = to_paisa(exit_premium)
+                pnl_p = (entry_premium_p - exit_premium_p) * lot_size
+                pnls.append(pnl_p / PAISA)
+                
+                updates.append((exit_premium_p, exit_time, pnl_p, exit_reason, trade_id))
+                if position is not None and trade_id not in seen:
+                    stats.append({"pnl": pnl_p})
+                else:
+                    # Re-closing replaces an old P&L, which MAX/MIN can't undo
+                    rebuild = True
+                seen.add(trade_id)
+            
+            for trade_id in seen:
+                self._open.pop(trade_id, None)
+            
+            if updates:
+                # Queued under the lock so closes reach the database in order
+                self._submit(self._write_closes, (updates, stats, rebuild), wait=False)
+        
+        return pnls
     
     def get_performance_summary(self) -> Dict:
         """Get overall performance statistics."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_trades,
-                SUM(CASE WHEN pnl > 0 THEN 1 ELSE 0 END) as winners,
-                SUM(CASE WHEN pnl < 0 THEN 1 ELSE 0 END) as losers,
-                SUM(pnl) as total_pnl,
-                AVG(pnl) as avg_pnl
-            FROM fno_trades
-            WHERE status = 'CLOSED'
-        """)
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        total_trades = row[0] if row[0] else 0
-        winners = row[1] if row[1] else 0
-        losers = row[2] if row[2] else 0
-        total_pnl = row[3] if row[3] else 0
-        avg_pnl = row[4] if row[4] else 0
+        self.flush()
+        total_trades, winners, losers, total_pnl_p = self._conn.execute(_SQL_SUMMARY).fetchone()
+        total_pnl = total_pnl_p / PAISA if total_pnl_p else 0
+        avg_pnl = total_pnl / total_trades if total_trades > 0 else 0
         
         win_rate = (winners / total_trades * 100) if total_trades > 0 else 0
         
@@ -277,7 +552,7 @@ class FnORiskManager:
             "total_trades": total_trades,
             "winners": winners,
             "losers": losers,
-            "total_pnl": round(total_pnl, 2),
+            "total_pnl": total_pnl,
             "avg_pnl": round(avg_pnl, 2),
             "win_rate": round(win_rate, 1)
         }
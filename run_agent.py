@@ -6,17 +6,44 @@ Usage:
     python run_agent.py --paper    # Paper trading mode
     python run_agent.py --live     # Live trading mode (requires confirmation)
     python run_agent.py --once     # Single scan cycle
+    python run_agent.py --log-level DEBUG  # Scan output level (default INFO
+                                           # with --once, else WARNING)
 """
 import sys
 import time
+import signal
+import asyncio
+import logging
 import argparse
-from datetime import datetime
+from datetime import datetime, time as dtime, timedelta, timezone
 
 from scanner.option_chain import OptionChainScanner
 from strategies.weekly_option_selling import WeeklyOptionSellingStrategy
 from execution.paper_trader import PaperTrader
 from utils.telegram import send_telegram_message, send_daily_summary
-from config.settings import INSTRUMENTS, SCAN_INTERVAL_SECONDS
+from config.settings import (
+    INSTRUMENTS, SCAN_INTERVAL_SECONDS, MARKET_OPEN_TIME, MARKET_CLOSE_TIME
+)
+
+IST = timezone(timedelta(hours=5, minutes=30))  # No DST, so a fixed offset is exact
+MARKET_OPEN = dtime.fromisoformat(MARKET_OPEN_TIME)
+MARKET_CLOSE = dtime.fromisoformat(MARKET_CLOSE_TIME)
+
+# Per-cycle scan output; below the configured level nothing is formatted
+log = logging.getLogger("fno.scan")
+
+
+class _Fmt:
+    """Log argument that applies a format spec only if the record is emitted."""
+    
+    __slots__ = ("value", "spec")
+    
+    def __init__(self, value, spec: str):
+        self.value = value
+        self.spec = spec
+    
+    def __str__(self) -> str:
+        return format(self.value, self.spec)
 
 
 def print_header():
@@ -34,62 +61,113 @@ def print_header():
     print("=" * 60 + "\n")
 
 
+def is_market_open(now: datetime) -> bool:
+    """True during the weekday trading session (exchange holidays aren't modelled)."""
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_scan_time(now: datetime) -> datetime:
+    """
+    When the next scan cycle should run.
+    
+    Args:
+        now: Current time in IST
+    
+    Returns:
+        now + SCAN_INTERVAL_SECONDS during market hours, otherwise the next
+        market open
+    """
+    if is_market_open(now):
+        return now + timedelta(seconds=SCAN_INTERVAL_SECONDS)
+    
+    day = now.date()
+    if now.time() >= MARKET_OPEN:  # Today's session is over (or it's a weekend)
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=IST)
+
+
+def block_sigterm():
+    """
+    Hold SIGTERM pending (POSIX) so wait_for_sigterm can collect it.
+    
+    Must run before any thread starts: threads inherit the signal mask, and
+    one with SIGTERM unblocked would let it kill the process mid-scan,
+    skipping atexit and the queued trade writes. A SIGTERM during a scan
+    then stops the agent at the next wait instead.
+    """
+    if hasattr(signal, "pthread_sigmask"):
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+
+
+def wait_for_sigterm(seconds: float) -> bool:
+    """
+    Sleep for up to `seconds`, returning early (True) if SIGTERM arrives.
+    
+    On POSIX SIGTERM (blocked by block_sigterm) is collected with
+    sigtimedwait, so a stop request ends the wait immediately; Ctrl-C still
+    raises KeyboardInterrupt. Elsewhere this is a plain sleep.
+    """
+    if not hasattr(signal, "sigtimedwait"):
+        time.sleep(seconds)
+        return False
+    
+    return signal.sigtimedwait({signal.SIGTERM}, seconds) is not None
+
+
 def run_scan_cycle(scanner, strategy, trader):
     """Run one complete scan cycle."""
-    print(f"\n{'─' * 60}")
-    print(f"  SCAN CYCLE: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'─' * 60}")
+    log.info("\n%s\n  SCAN CYCLE: %s\n%s", "─" * 60, _Fmt(datetime.now(), "%Y-%m-%d %H:%M:%S"), "─" * 60)
     
     # Monitor existing positions
     open_positions = trader.risk_mgr.get_open_positions()
     if open_positions:
-        print(f"\n  Monitoring {len(open_positions)} open positions...")
+        log.info("\n  Monitoring %d open positions...", len(open_positions))
         closed = trader.monitor_positions(scanner, strategy)
         if closed:
             for c in closed:
-                print(f"    ✓ Closed {c['symbol']} {c['strike']} {c['option_type']}: {c['reason']} (P&L: ₹{c['pnl']:+,.0f})")
+                log.info("    ✓ Closed %s %s %s: %s (P&L: ₹%s)", c['symbol'], c['strike'],
+                         c['option_type'], c['reason'], _Fmt(c['pnl'], "+,.0f"))
     
     # Scan for new signals
-    print(f"\n  Scanning for new signals...")
+    log.info("\n  Scanning for new signals...")
     signals_generated = 0
     
-    for symbol in INSTRUMENTS:
+    # Fetch every symbol's spot, expiry and option chain concurrently; the
+    # network calls dominate a scan, so wall time is the slowest request
+    fetches = asyncio.run(scanner.get_chain_and_spot(INSTRUMENTS))
+    
+    for symbol, fetch in zip(INSTRUMENTS, fetches):
         try:
-            # Get spot price
-            spot = scanner.get_spot_price(symbol)
-            print(f"\n  {symbol}: Spot = ₹{spot:,.2f}")
-            
-            # Get weekly expiry
-            expiry = scanner.get_weekly_expiry(symbol)
-            print(f"  Expiry: {expiry}")
-            
-            # Get option chain
-            option_chain = scanner.get_option_chain(symbol, expiry)
+            if isinstance(fetch, BaseException):
+                raise fetch
+            spot, expiry, option_chain = fetch
+            log.info("\n  %s: Spot = ₹%s\n  Expiry: %s", symbol, _Fmt(spot, ",.2f"), expiry)
             
             # Generate signals
             signals = strategy.generate_signals(option_chain, spot, symbol, expiry)
             
             if signals:
-                print(f"  Found {len(signals)} signal(s)")
+                log.info("  Found %d signal(s)", len(signals))
                 for signal in signals:
                     signal["strategy"] = strategy.name
                     signal["lot_size"] = strategy.get_lot_size(symbol)
-                    
-                    # Execute trade
-                    if trader.execute_trade(signal):
-                        signals_generated += 1
+                
+                # Execute trades (recorded together in one transaction)
+                signals_generated += trader.execute_trades(signals)
             else:
-                print(f"  No signals (not Monday or conditions not met)")
+                log.info("  No signals (not Monday or conditions not met)")
         
         except Exception as e:
-            print(f"  Error scanning {symbol}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("  Error scanning %s: %s", symbol, e)
     
-    # Print summary
-    perf = trader.get_performance()
-    print(f"\n  SUMMARY: Open={len(open_positions)} | Signals={signals_generated}")
-    print(f"  Performance: Trades={perf['total_trades']} | P&L=₹{perf['total_pnl']:+,.0f} | WR={perf['win_rate']}%")
+    # Summary (skips the performance query too when INFO is off)
+    if log.isEnabledFor(logging.INFO):
+        perf = trader.get_performance()
+        log.info("\n  SUMMARY: Open=%d | Signals=%d", len(open_positions), signals_generated)
+        log.info("  Performance: Trades=%d | P&L=₹%s | WR=%s%%", perf['total_trades'],
+                 _Fmt(perf['total_pnl'], "+,.0f"), perf['win_rate'])
     
     return signals_generated
 
@@ -100,6 +178,8 @@ def main():
     parser.add_argument("--paper", action="store_true", help="Paper trading mode")
     parser.add_argument("--live", action="store_true", help="Live trading mode")
     parser.add_argument("--once", action="store_true", help="Run once and exit")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Scan cycle output level (default: INFO with --once, else WARNING)")
     args = parser.parse_args()
     
     # Determine mode
@@ -112,6 +192,14 @@ def main():
         mode = "PAPER"
     
     single_run = args.once
+    if not single_run:
+        block_sigterm()  # Before PaperTrader and the scanner start any threads
+    
+    logging.basicConfig(
+        level=args.log_level or ("INFO" if single_run else "WARNING"),
+        format="%(message)s",
+        stream=sys.stdout
+    )
     
     print_header()
     print(f"  Mode: {mode} Trading")
@@ -145,10 +233,17 @@ def main():
     
     while True:
         try:
-            run_scan_cycle(scanner, strategy, trader)
+            # Outside market hours there is nothing to do unless positions are open
+            if is_market_open(datetime.now(IST)) or trader.risk_mgr.get_open_positions_count():
+                run_scan_cycle(scanner, strategy, trader)
+            else:
+                log.info("  Market closed, no open positions - skipping scan")
             
-            print(f"\n  Next scan in {SCAN_INTERVAL_SECONDS}s...")
-            time.sleep(SCAN_INTERVAL_SECONDS)
+            wake = next_scan_time(datetime.now(IST))
+            delay = max(0.0, (wake - datetime.now(IST)).total_seconds())
+            log.info("\n  Next scan at %s IST (in %.0fs)...", _Fmt(wake, "%Y-%m-%d %H:%M:%S"), delay)
+            if wait_for_sigterm(delay):
+                raise KeyboardInterrupt  # Shut down exactly as on Ctrl-C
         
         except KeyboardInterrupt:
             print("\n\n  Stopping agent...")
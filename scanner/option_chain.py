@@ -2,9 +2,46 @@
 Option chain scanner for Nifty & Bank Nifty
 Fetches real-time option chain data from NSE/Kite
 """
-import requests
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import asyncio
+import glob
+import os
+import threading
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple, Union
+from config.settings import INSTRUMENTS_CACHE_DIR, SPOT_CACHE_SECONDS
+from utils.cache import TTLCache
+from utils.http import loads_json, make_session
+
+# Kite's quote() accepts at most this many instruments per request
+KITE_QUOTE_BATCH = 500
+
+
+@lru_cache(maxsize=8)
+def _weekly_expiry(symbol: str, today: date) -> str:
+    """Next weekly expiry after today, as "YYYY-MM-DD" (cached per symbol and day)."""
+    # Nifty expires on Thursday, Bank Nifty on Wednesday
+    if symbol == "NIFTY":
+        target_weekday = 3  # Thursday
+    else:  # BANKNIFTY
+        target_weekday = 2  # Wednesday
+    
+    days_ahead = target_weekday - today.weekday()
+    if days_ahead <= 0:  # Target day already happened this week
+        days_ahead += 7
+    
+    expiry = today + timedelta(days=days_ahead)
+    return expiry.strftime("%Y-%m-%d")
+
+
+@lru_cache(maxsize=16)
+def _strikes_around(base: float, step: int, range_strikes: int) -> np.ndarray:
+    """range_strikes ascending strikes spaced by step, centred on base (cached, read-only)."""
+    strikes = base + (np.arange(range_strikes) - range_strikes // 2) * step
+    strikes.flags.writeable = False  # Shared by every caller
+    return strikes
 
 
 class OptionChainScanner:
@@ -22,17 +59,38 @@ class OptionChainScanner:
             'User-Agent': 'Mozilla/5.0',
             'Accept': 'application/json'
         }
+        self._session = make_session(self.nse_headers)  # Keep-alive NSE connection
+        
+        # NFO option instruments, refreshed once per day: (date, DataFrame)
+        self._nfo_instruments = None
+        self._nfo_lock = threading.Lock()  # Concurrent chain fetches download it once
+        
+        # Spot quotes by symbol, shared by the scan's spot fetch and the NSE
+        # option chain (which needs spot too) within one cycle
+        self._spot_cache = TTLCache(SPOT_CACHE_SECONDS)
     
     def get_spot_price(self, symbol: str) -> float:
         """
         Get current spot price of index.
         
+        Cached for SPOT_CACHE_SECONDS, so concurrent callers share one
+        request. The approximate fallback used when NSE can't be reached
+        is not cached, so the next call tries again.
+        
         Args:
             symbol: "NIFTY" or "BANKNIFTY"
         
         Returns:
             Current spot price
         """
+        spot = self._spot_cache.get_or_compute(symbol, self._fetch_spot_price)
+        if spot is None:
+            # Return approximate values for testing
+            return 22000.0 if symbol == "NIFTY" else 48000.0
+        return spot
+    
+    def _fetch_spot_price(self, symbol: str) -> Optional[float]:
+        """Fetch the spot price (None if the NSE fallback request failed)."""
         if self.kite:
             # Use Kite for live data
             instrument = f"NSE:{symbol}"
@@ -43,19 +101,18 @@ class OptionChainScanner:
             # In production, always use Kite for reliable data
             return self._get_nse_spot_price(symbol)
     
-    def _get_nse_spot_price(self, symbol: str) -> float:
-        """Fetch spot price from NSE (fallback method)."""
+    def _get_nse_spot_price(self, symbol: str) -> Optional[float]:
+        """Fetch spot price from NSE (fallback method; None on failure)."""
         # Note: NSE API may require additional authentication
         # This is a simplified version for demonstration
         try:
             url = f"https://www.nseindia.com/api/option-chain-indices?symbol={symbol}"
-            response = requests.get(url, headers=self.nse_headers, timeout=10)
-            data = response.json()
+            response = self._session.get(url, timeout=10)
+            data = loads_json(response.content)
             return float(data['records']['underlyingValue'])
         except Exception as e:
             print(f"Error fetching NSE spot price: {e}")
-            # Return approximate values for testing
-            return 22000.0 if symbol == "NIFTY" else 48000.0
+            return None
     
     def get_weekly_expiry(self, symbol: str) -> str:
         """
@@ -67,20 +124,8 @@ class OptionChainScanner:
         Returns:
             Expiry date in format "YYYY-MM-DD"
         """
-        today = datetime.now()
-        
-        # Nifty expires on Thursday, Bank Nifty on Wednesday
-        if symbol == "NIFTY":
-            target_weekday = 3  # Thursday
-        else:  # BANKNIFTY
-            target_weekday = 2  # Wednesday
-        
-        days_ahead = target_weekday - today.weekday()
-        if days_ahead <= 0:  # Target day already happened this week
-            days_ahead += 7
-        
-        expiry = today + timedelta(days=days_ahead)
-        return expiry.strftime("%Y-%m-%d")
+        # Keyed on today's date, so the cached value rolls over at midnight
+        return _weekly_expiry(symbol, datetime.now().date())
     
     def get_option_chain(self, symbol: str, expiry: str) -> Dict:
         """
@@ -98,40 +143,123 @@ class OptionChainScanner:
         else:
             return self._get_nse_option_chain(symbol, expiry)
     
+    def _get_nfo_instruments(self) -> pd.DataFrame:
+        """
+        CE/PE rows of the NFO instrument master, as a DataFrame.
+        
+        The master changes daily, so it is fetched once a day and kept on
+        disk under INSTRUMENTS_CACHE_DIR, letting a restarted agent skip the
+        multi-MB download. Keeping only the option columns chains are
+        filtered on makes each lookup a few vectorized comparisons instead
+        of a Python loop over ~80k rows.
+        """
+        today = datetime.now().date()
+        with self._nfo_lock:
+            if self._nfo_instruments is None or self._nfo_instruments[0] != today:
+                self._nfo_instruments = (today, self._load_nfo_instruments(today))
+            return self._nfo_instruments[1]
+    
+    def _load_nfo_instruments(self, today: date) -> pd.DataFrame:
+        """Read today's instrument cache file, or download and write it."""
+        cache_path = os.path.join(INSTRUMENTS_CACHE_DIR,
+                                  f"nfo_instruments_{today:%Y%m%d}.pkl")
+        if os.path.exists(cache_path):
+            try:
+                return pd.read_pickle(cache_path)
+            except Exception as e:
+                print(f"Instrument cache unreadable, downloading again: {e}")
+        
+        df = pd.DataFrame(self.kite.instruments("NFO"),
+                          columns=['name', 'expiry', 'instrument_type',
+                                   'strike', 'tradingsymbol'])
+        df = df[df['instrument_type'].isin(['CE', 'PE'])].reset_index(drop=True)
+        df['expiry'] = pd.to_datetime(df['expiry'])
+        df['name'] = df['name'].astype('category')  # Compares integer codes
+        
+        try:
+            os.makedirs(INSTRUMENTS_CACHE_DIR, exist_ok=True)
+            # Write then rename, so a reader never sees a partial file
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            df.to_pickle(tmp_path)
+            os.replace(tmp_path, cache_path)
+            
+            # Earlier days' masters are never read again
+            for stale in glob.glob(os.path.join(INSTRUMENTS_CACHE_DIR, "nfo_instruments_*.pkl")):
+                if stale != cache_path:
+                    os.remove(stale)
+        except OSError as e:
+            print(f"Could not cache instruments: {e}")
+        return df
+    
+    async def get_chain_and_spot(self, symbols: List[str]) -> List[Union[Tuple, Exception]]:
+        """
+        Fetch spot, weekly expiry and option chain for several symbols at once.
+        
+        The blocking Kite/NSE calls run in worker threads, so every symbol
+        (and, with Kite, each symbol's spot and chain) is fetched in
+        parallel and the wait is the slowest request, not their sum.
+        
+        Args:
+            symbols: e.g. ["NIFTY", "BANKNIFTY"]
+        
+        Returns:
+            One (spot, expiry, option_chain) tuple per symbol, in order, or
+            the exception that symbol's fetch raised
+        """
+        return await asyncio.gather(
+            *(self._fetch_chain_and_spot(symbol) for symbol in symbols),
+            return_exceptions=True
+        )
+    
+    async def _fetch_chain_and_spot(self, symbol: str) -> Tuple[float, str, Dict]:
+        """Spot, expiry and option chain for one symbol (see get_chain_and_spot)."""
+        expiry = self.get_weekly_expiry(symbol)
+        if self.kite:
+            spot, option_chain = await asyncio.gather(
+                asyncio.to_thread(self.get_spot_price, symbol),
+                asyncio.to_thread(self.get_option_chain, symbol, expiry)
+            )
+        else:
+            # The NSE chain reuses the cached spot, so fetch that first
+            spot = await asyncio.to_thread(self.get_spot_price, symbol)
+            option_chain = await asyncio.to_thread(self.get_option_chain, symbol, expiry)
+        return spot, expiry, option_chain
+    
     def _get_kite_option_chain(self, symbol: str, expiry: str) -> Dict:
         """Fetch option chain from Kite Connect."""
-        # Get all instruments
-        instruments = self.kite.instruments("NFO")
-        
         # Filter for the symbol and expiry
         expiry_dt = datetime.strptime(expiry, "%Y-%m-%d")
         
+        df = self._get_nfo_instruments()
+        mask = (df['name'] == symbol) & (df['expiry'] == expiry_dt)
+        matches = list(df.loc[mask, ['strike', 'instrument_type', 'tradingsymbol']]
+                       .itertuples(index=False, name=None))
+        
+        # Quote the whole chain in as few requests as possible
+        keys = [f"NFO:{tradingsymbol}" for _, _, tradingsymbol in matches]
+        quotes = {}
+        for i in range(0, len(keys), KITE_QUOTE_BATCH):
+            quotes.update(self.kite.quote(keys[i:i + KITE_QUOTE_BATCH]))
+        
         options = {
             "CE": {},
             "PE": {}
         }
         
-        for inst in instruments:
-            if (inst['name'] == symbol and 
-                inst['expiry'] == expiry_dt.date() and
-                inst['instrument_type'] in ['CE', 'PE']):
-                
-                strike = inst['strike']
-                opt_type = inst['instrument_type']
-                
-                # Get quote
-                quote = self.kite.quote(f"NFO:{inst['tradingsymbol']}")
-                data = quote[f"NFO:{inst['tradingsymbol']}"]
-                
-                options[opt_type][strike] = {
-                    "strike": strike,
-                    "ltp": data['last_price'],
-                    "bid": data['depth']['buy'][0]['price'] if data['depth']['buy'] else 0,
-                    "ask": data['depth']['sell'][0]['price'] if data['depth']['sell'] else 0,
-                    "volume": data['volume'],
-                    "oi": data['oi'],
-                    "tradingsymbol": inst['tradingsymbol']
-                }
+        for (strike, opt_type, tradingsymbol), key in zip(matches, keys):
+            data = quotes.get(key)
+            if data is None:  # Kite leaves out instruments it can't quote
+                continue
+            
+            options[opt_type][strike] = {
+                "strike": strike,
+                "ltp": data['last_price'],
+                "bid": data['depth']['buy'][0]['price'] if data['depth']['buy'] else 0,
+                "ask": data['depth']['sell'][0]['price'] if data['depth']['sell'] else 0,
+                "volume": data['volume'],
+                "oi": data['oi'],
+                "tradingsymbol": tradingsymbol
+            }
         
         return options
     
@@ -149,31 +277,29 @@ class OptionChainScanner:
         # Generate strikes around spot (for testing)
         strikes = self._generate_strikes(spot, symbol)
         
-        for strike in strikes:
-            # Mock data for testing
-            options["CE"][strike] = {
-                "strike": strike,
-                "ltp": max(1, (spot - strike) * 0.1) if spot > strike else 5,
-                "bid": 0,
-                "ask": 0,
-                "volume": 1000,
-                "oi": 5000,
-                "tradingsymbol": f"{symbol}{expiry.replace('-', '')}{strike}CE"
-            }
-            options["PE"][strike] = {
-                "strike": strike,
-                "ltp": max(1, (strike - spot) * 0.1) if strike > spot else 5,
-                "bid": 0,
-                "ask": 0,
-                "volume": 1000,
-                "oi": 5000,
-                "tradingsymbol": f"{symbol}{expiry.replace('-', '')}{strike}PE"
+        # Mock premiums for the whole grid: 10% of intrinsic (min 1), else 5
+        ce_ltp = np.where(spot > strikes, np.maximum(1.0, (spot - strikes) * 0.1), 5.0)
+        pe_ltp = np.where(strikes > spot, np.maximum(1.0, (strikes - spot) * 0.1), 5.0)
+        prefix = f"{symbol}{expiry.replace('-', '')}"
+        
+        for opt_type, ltps in (("CE", ce_ltp), ("PE", pe_ltp)):
+            options[opt_type] = {
+                strike: {
+                    "strike": strike,
+                    "ltp": ltp,
+                    "bid": 0,
+                    "ask": 0,
+                    "volume": 1000,
+                    "oi": 5000,
+                    "tradingsymbol": f"{prefix}{strike}{opt_type}"
+                }
+                for strike, ltp in zip(strikes.tolist(), ltps.tolist())
             }
         
         return options
     
-    def _generate_strikes(self, spot: float, symbol: str) -> List[float]:
-        """Generate strike prices around spot."""
+    def _generate_strikes(self, spot: float, symbol: str) -> np.ndarray:
+        """Generate strike prices around spot (read-only array, ascending)."""
         if symbol == "NIFTY":
             step = 50
             range_strikes = 20
@@ -181,10 +307,9 @@ class OptionChainScanner:
             step = 100
             range_strikes = 20
         
+        # The grid depends on spot only through its nearest strike
         base = round(spot / step) * step
-        strikes = [base + (i - range_strikes // 2) * step 
-                  for i in range(range_strikes)]
-        return sorted(strikes)
+        return _strikes_around(base, step, range_strikes)
     
     def find_otm_strike(self, spot: float, symbol: str, option_type: str,
                        otm_percentage: float = 0.15) -> float:
@@ -212,3 +337,48 @@ class OptionChainScanner:
         
         strike = round(target / step) * step
         return strike
+    
+    def find_otm_strikes(self, spot: float, symbol: str, option_types,
+                         otm_percentages) -> np.ndarray:
+        """
+        Vectorized find_otm_strike over a ladder of OTM points.
+        
+        option_types and otm_percentages broadcast against each other, so
+        e.g. (["PE", "CE"], [[0.10], [0.15], [0.20]]) gives a 3x2 grid.
+        
+        Args:
+            spot: Current spot price
+            symbol: "NIFTY" or "BANKNIFTY"
+            option_types: "CE"/"PE" value or array of them
+            otm_percentages: How far OTM, scalar or array
+        
+        Returns:
+            Array of strike prices (same rounding as find_otm_strike)
+        """
+        step = 50 if symbol == "NIFTY" else 100
+        signs = np.where(np.asarray(option_types) == "CE", 1.0, -1.0)
+        targets = spot * (1 + signs * np.asarray(otm_percentages, dtype=np.float64))
+        return np.round(targets / step) * step
+    
+    @staticmethod
+    def nearest_listed_strikes(chain_side: Dict, strikes) -> np.ndarray:
+        """
+        Snap strikes to the nearest strike listed in one side of a chain.
+        
+        A binary search over the sorted listed strikes replaces per-strike
+        dict membership checks; ties go to the lower strike.
+        
+        Args:
+            chain_side: option_chain["CE"] or option_chain["PE"] (non-empty)
+            strikes: Wanted strike(s), e.g. from find_otm_strikes
+        
+        Returns:
+            Array of listed strikes, same shape as strikes
+        """
+        listed = np.sort(np.fromiter(chain_side, dtype=np.float64, count=len(chain_side)))
+        strikes = np.asarray(strikes, dtype=np.float64)
+        
+        hi = np.clip(np.searchsorted(listed, strikes), 1, len(listed) - 1)
+        lo = hi - 1
+        nearer_lo = strikes - listed[lo] <= listed[hi] - strikes
+        return listed[np.where(nearer_lo, lo, hi)]
@@ -2,6 +2,7 @@
 Base strategy class for F&O trading
 """
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import Dict, List, Optional
 import pandas as pd
 
@@ -36,13 +37,15 @@ class BaseStrategy(ABC):
         pass
     
     @abstractmethod
-    def should_exit(self, position: Dict, current_premium: float) -> tuple:
+    def should_exit(self, position: Dict, current_premium: float,
+                    now: Optional[datetime] = None) -> tuple:
         """
         Check if position should be exited.
         
         Args:
             position: Position details
             current_premium: Current option premium
+            now: Time of the check (defaults to datetime.now())
         
         Returns:
             (should_exit: bool, reason: str)
@@ -8,11 +8,18 @@ Strategy:
 - Stop Loss: 2x premium received
 - Conservative: 1 lot per trade
 """
-from typing import Dict, List
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import date, datetime
 from strategies.base import BaseStrategy
 from config.settings import OTM_PERCENTAGE, PROFIT_TARGET, STOP_LOSS_MULTIPLIER
 
+# Weekdays as bits (bit 0 = Monday), tested with 1 << weekday()
+_ENTRY_DAYS = 1 << 0  # Monday
+_EXIT_DAYS = (1 << 3) | (1 << 4)  # Thursday, Friday
+
+# Entries open at 9:30 AM, in minutes since midnight
+_ENTRY_START_MINUTE = 9 * 60 + 30
+
 
 class WeeklyOptionSellingStrategy(BaseStrategy):
     """Weekly option selling strategy for consistent income."""
@@ -41,11 +48,11 @@ class WeeklyOptionSellingStrategy(BaseStrategy):
         
         # Check if it's Monday
         today = datetime.now()
-        if today.weekday() != 0:  # 0 = Monday
+        if not (1 << today.weekday()) & _ENTRY_DAYS:
             return signals
         
         # Check if market hours (9:30 AM onwards)
-        if today.hour < 9 or (today.hour == 9 and today.minute < 30):
+        if today.hour * 60 + today.minute < _ENTRY_START_MINUTE:
             return signals
         
         # Find OTM Put strike
@@ -88,7 +95,8 @@ class WeeklyOptionSellingStrategy(BaseStrategy):
         
         return signals
     
-    def should_exit(self, position: Dict, current_premium: float) -> tuple:
+    def should_exit(self, position: Dict, current_premium: float,
+                    now: Optional[datetime] = None) -> tuple:
         """
         Check exit conditions.
         
@@ -100,7 +108,10 @@ class WeeklyOptionSellingStrategy(BaseStrategy):
         
         Args:
             position: Position details with entry_premium, stop_loss, target
+                (and expiry_date, if already parsed)
             current_premium: Current option premium
+            now: Time of the check; pass one value for a whole batch of
+                positions (defaults to datetime.now())
         
         Returns:
             (should_exit: bool, reason: str)
@@ -118,16 +129,16 @@ class WeeklyOptionSellingStrategy(BaseStrategy):
             return (True, "Stop Loss Hit")
         
         # Check day of week
-        today = datetime.now()
+        today = now or datetime.now()
         weekday = today.weekday()
         
-        # Exit on Thursday (3) or Friday (4)
-        if weekday in [3, 4]:
+        # Exit on Thursday or Friday
+        if (1 << weekday) & _EXIT_DAYS:
             return (True, f"Exit Day ({today.strftime('%A')})")
         
         # Check if expiry day
-        expiry_date = datetime.strptime(position["expiry"], "%Y-%m-%d")
-        if today.date() >= expiry_date.date():
+        expiry_date = position.get("expiry_date") or date.fromisoformat(position["expiry"])
+        if today.date() >= expiry_date:
             return (True, "Expiry Day")
         
         return (False, "")
@@ -0,0 +1,37 @@
+"""
+Ahead-of-time build of the Greeks kernels (requires Numba)
+
+    python -m utils._compile_greeks
+
+writes the utils/greeks_aot extension module; utils.greeks imports it when
+present instead of JIT-compiling _bs_core and _bs_price_vega at startup.
+Rebuild after changing either kernel or upgrading NumPy/Python.
+"""
+import os
+
+from numba.pycc import CC
+
+from utils.greeks import _AOT_KERNELS
+
+
+def build() -> str:
+    """
+    Compile every kernel in utils.greeks._AOT_KERNELS into utils/greeks_aot.
+    
+    Returns:
+        Directory the extension was written to
+    """
+    cc = CC("greeks_aot")
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    cc.verbose = False
+    
+    for name, (kernel, signature) in _AOT_KERNELS.items():
+        # Compile the original Python source, not an already-loaded build
+        cc.export(name, signature)(kernel.py_func)
+    
+    cc.compile()
+    return cc.output_dir
+
+
+if __name__ == "__main__":
+    print(f"Built greeks_aot in {build()}")
@@ -0,0 +1,19 @@
+"""
+Optional Numba support for the compiled kernels
+
+Importing this module compiles nothing: it only provides njit/prange, or
+no-op stand-ins when Numba isn't installed so the same functions run as
+plain Python.
+"""
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on environment
+    NUMBA_AVAILABLE = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
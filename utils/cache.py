@@ -0,0 +1,60 @@
+"""
+Small caching helpers for F&O Trading Agent
+"""
+import threading
+import time
+from typing import Callable, Dict, Hashable
+
+
+class TTLCache:
+    """
+    Thread-safe memo for values that stay valid for ttl_seconds.
+    
+    Meant to live on the instance that owns the data, so entries die with
+    it. Concurrent lookups of one key share a single compute call, while
+    different keys compute in parallel. None results are not cached.
+    """
+    
+    def __init__(self, ttl_seconds: float):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            ttl_seconds: How long a cached value stays valid
+        """
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}  # key -> (expires_at, value)
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+    
+    def get_or_compute(self, key: Hashable, compute: Callable):
+        """
+        Cached value for key, calling compute(key) when missing or expired.
+        
+        Args:
+            key: Cache key
+            compute: Called with key; exceptions propagate and aren't cached
+        
+        Returns:
+            The cached or freshly computed value
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            # Measured after the wait, so a value a concurrent caller just
+            # computed counts as fresh
+            now = time.monotonic()
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] > now:
+                return hit[1]
+            
+            value = compute(key)
+            if value is not None:
+                self._entries[key] = (now + self.ttl_seconds, value)
+            return value
+    
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,205 @@
+"""
+SQLite helpers for F&O Trading Agent
+Long-lived connections, the trades schema and its running aggregates
+"""
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+# Applied once per connection
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",  # ~20 MB page cache
+    "PRAGMA cache_spill=0",  # Keep dirty pages in memory until COMMIT
+    "PRAGMA mmap_size=268435456",  # Read pages through a 256 MB memory map
+)
+
+# Comfortably above the number of distinct statements a connection runs
+_CACHED_STATEMENTS = 128
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Open a long-lived connection to the trades database.
+    
+    The connection runs in autocommit mode (explicit BEGIN/COMMIT where a
+    group of statements must be atomic) and may be used from any thread.
+    sqlite3 keeps compiled statements in a per-connection cache, sized so
+    every module-level query stays compiled and reusing the same SQL text
+    skips parsing and planning on every call.
+    
+    Args:
+        db_path: Path to the SQLite database file
+    
+    Returns:
+        Open sqlite3.Connection
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False,
+                           cached_statements=_CACHED_STATEMENTS)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# Rupee amounts are stored as INTEGER paisa (x100) in the *_p columns, so
+# P&L is exact integer arithmetic and SUM/AVG run on integer opcodes
+PAISA = 100
+
+_SQL_CREATE_TRADES = """
+    CREATE TABLE IF NOT EXISTS fno_trades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        option_type TEXT NOT NULL,
+        strike_p INTEGER NOT NULL,
+        entry_premium_p INTEGER NOT NULL,
+        exit_premium_p INTEGER,
+        lot_size INTEGER NOT NULL,
+        entry_time TEXT NOT NULL,
+        exit_time TEXT,
+        pnl_p INTEGER,
+        status TEXT NOT NULL,
+        exit_reason TEXT,
+        strategy TEXT,
+        expiry TEXT
+    )
+"""
+
+# One-shot copy from the old REAL-rupee layout (see _migrate_to_paisa)
+_SQL_COPY_REAL_TRADES = """
+    INSERT INTO fno_trades
+    (id, symbol, option_type, strike_p, entry_premium_p, exit_premium_p, lot_size,
+     entry_time, exit_time, pnl_p, status, exit_reason, strategy, expiry)
+    SELECT id, symbol, option_type,
+           CAST(ROUND(strike * 100) AS INTEGER),
+           CAST(ROUND(entry_premium * 100) AS INTEGER),
+           CAST(ROUND(exit_premium * 100) AS INTEGER),
+           lot_size, entry_time, exit_time,
+           CAST(ROUND(pnl * 100) AS INTEGER),
+           status, exit_reason, strategy, expiry
+    FROM fno_trades_real
+"""
+
+# pnl_p is included so the daily/symbol aggregates are answered from the index
+# alone; the partial index keeps open-position lookups off the closed history;
+# entry_time lets "recent trades" read the newest rows without sorting
+_SQL_CREATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_trades_status_exit ON fno_trades(status, exit_time, pnl_p)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_symbol_status ON fno_trades(symbol, status, pnl_p)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_open ON fno_trades(status) WHERE status = 'OPEN'",
+    "CREATE INDEX IF NOT EXISTS idx_trades_entry_time ON fno_trades(entry_time)",
+)
+
+# Single-row running aggregates over fno_trades, kept in step by the writers
+_SQL_CREATE_STATS = """
+    CREATE TABLE IF NOT EXISTS fno_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL,
+        winners INTEGER NOT NULL,
+        losers INTEGER NOT NULL,
+        total_pnl_p INTEGER NOT NULL,
+        max_win_p INTEGER,
+        min_loss_p INTEGER,
+        open_count INTEGER NOT NULL
+    )
+"""
+
+# Rebuild the stats row from fno_trades (full scan; startup and repairs only)
+_SQL_REBUILD_STATS = """
+    INSERT OR {conflict} INTO fno_stats
+    (id, total, winners, losers, total_pnl_p, max_win_p, min_loss_p, open_count)
+    SELECT 1,
+           COALESCE(SUM(status = 'CLOSED'), 0),
+           COALESCE(SUM(status = 'CLOSED' AND pnl_p > 0), 0),
+           COALESCE(SUM(status = 'CLOSED' AND pnl_p < 0), 0),
+           COALESCE(SUM(CASE WHEN status = 'CLOSED' THEN pnl_p END), 0),
+           MAX(CASE WHEN status = 'CLOSED' THEN pnl_p END),
+           MIN(CASE WHEN status = 'CLOSED' THEN pnl_p END),
+           COALESCE(SUM(status = 'OPEN'), 0)
+    FROM fno_trades
+"""
+
+
+def to_paisa(rupees: float) -> int:
+    """Quantize a rupee amount to integer paisa."""
+    return int(round(rupees * PAISA))
+
+
+def init_schema(conn: sqlite3.Connection):
+    """Create the trades table, its indexes and the stats table (seeded from trades)."""
+    with transaction(conn):
+        _migrate_to_paisa(conn)
+        conn.execute(_SQL_CREATE_TRADES)
+        
+        existing = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_trades_%'"
+        ).fetchone()[0]
+        for ddl in _SQL_CREATE_INDEXES:
+            conn.execute(ddl)
+        if existing < len(_SQL_CREATE_INDEXES):
+            # Give the planner statistics for the new indexes
+            conn.execute("ANALYZE fno_trades")
+        
+        conn.execute(_SQL_CREATE_STATS)
+        if conn.execute("SELECT 1 FROM fno_stats WHERE id = 1").fetchone() is None:
+            conn.execute(_SQL_REBUILD_STATS.format(conflict="IGNORE"))
+
+
+def _migrate_to_paisa(conn: sqlite3.Connection):
+    """Rebuild a trades table from the REAL-rupee layout into paisa columns."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(fno_trades)")}
+    if "pnl" not in columns:
+        return  # New database or already migrated
+    
+    # Renaming carries the old indexes along; dropping the copy removes them
+    conn.execute("ALTER TABLE fno_trades RENAME TO fno_trades_real")
+    conn.execute(_SQL_CREATE_TRADES)
+    conn.execute(_SQL_COPY_REAL_TRADES)
+    conn.execute("DROP TABLE fno_trades_real")
+    
+    # Old stats hold REAL rupees; init_schema reseeds them from the new table
+    conn.execute("DROP TABLE IF EXISTS fno_stats")
+
+
+def check_query_plans(conn: sqlite3.Connection, queries: Dict[str, Tuple[str, tuple]]):
+    """
+    Warn about hot queries that SQLite would answer with a full table scan.
+    
+    Run once at startup: a dropped index or stale statistics show up here
+    rather than as a slow scan cycle. Only a warning, since the queries
+    still return correct results.
+    
+    Args:
+        conn: Connection with the schema in place
+        queries: Name -> (sql, sample parameters)
+    """
+    for name, (sql, params) in queries.items():
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+            detail = row[3]
+            if detail.startswith("SCAN ") and "INDEX" not in detail:
+                print(f"Warning: {name} does a full table scan ({detail}); "
+                      f"check the idx_trades_* indexes")
+
+
+def rebuild_stats(conn: sqlite3.Connection):
+    """Recompute the fno_stats row from fno_trades."""
+    conn.execute(_SQL_REBUILD_STATS.format(conflict="REPLACE"))
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection, mode: str = "IMMEDIATE"):
+    """
+    Run a group of statements atomically on an autocommit connection.
+    
+    The default BEGIN IMMEDIATE takes the write lock up front so concurrent
+    writers queue here instead of failing midway through the group. Readers
+    pass mode="DEFERRED" to see one consistent snapshot across queries.
+    """
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -1,10 +1,169 @@
 """
 Greeks calculator for options using Black-Scholes model
 """
-import numpy as np
-from scipy.stats import norm
+from math import log, sqrt, exp, erfc
 from datetime import datetime
 
+import numpy as np
+from scipy.special import ndtr
+
+from utils._numba import NUMBA_AVAILABLE, njit, prange
+
+try:
+    from py_lets_be_rational import (
+        implied_volatility_from_a_transformed_rational_guess as _lbr_implied_volatility
+    )
+    from py_lets_be_rational.exceptions import AboveMaximumException, BelowIntrinsicException
+    LBR_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on environment
+    LBR_AVAILABLE = False
+
+# Φ(x) = 0.5 * erfc(-x / sqrt(2)) and φ(x) = exp(-x²/2) / sqrt(2π)
+_INV_SQRT2 = 0.7071067811865476
+_INV_SQRT_2PI = 0.3989422804014327
+
+
+@njit(cache=True, fastmath=True)
+def _bs_core(spot: float, strike: float, time_to_expiry: float, volatility: float,
+             risk_free_rate: float, is_call: bool):
+    """
+    Unrounded Black-Scholes premium and Greeks for one contract (T > 0).
+    
+    Returns:
+        Tuple of (delta, gamma, theta, vega, rho, premium), in the units
+        calculate_greeks reports
+    """
+    sqrt_t = sqrt(time_to_expiry)
+    v = volatility * sqrt_t
+    d1 = (log(spot / strike) + (risk_free_rate + 0.5 * volatility * volatility) * time_to_expiry) / v
+    d2 = d1 - v
+    # One exp each for the discount factor and φ(d1), shared by every Greek
+    discounted_strike = strike * exp(-risk_free_rate * time_to_expiry)
+    pdf_d1 = _INV_SQRT_2PI * exp(-0.5 * d1 * d1)
+    
+    if is_call:
+        nd1 = 0.5 * erfc(-d1 * _INV_SQRT2)
+        nd2 = 0.5 * erfc(-d2 * _INV_SQRT2)
+        delta = nd1
+        premium = spot * nd1 - discounted_strike * nd2
+        rho = discounted_strike * time_to_expiry * nd2 / 100
+    else:
+        nd1 = 0.5 * erfc(d1 * _INV_SQRT2)  # Φ(-d1)
+        nd2 = 0.5 * erfc(d2 * _INV_SQRT2)  # Φ(-d2)
+        delta = -nd1
+        premium = discounted_strike * nd2 - spot * nd1
+        rho = -discounted_strike * time_to_expiry * nd2 / 100
+    
+    gamma = pdf_d1 / (spot * v)
+    vega = spot * pdf_d1 * sqrt_t / 100  # Per 1% change in IV
+    theta = (-spot * pdf_d1 * volatility / (2 * sqrt_t) -
+             risk_free_rate * discounted_strike * nd2) / 365
+    
+    return delta, gamma, theta, vega, rho, premium
+
+
+@njit(cache=True, fastmath=True)
+def _bs_price_vega(spot: float, strike: float, time_to_expiry: float, volatility: float,
+                   risk_free_rate: float, is_call: bool):
+    """
+    Unrounded premium and vega (per 1.0 of volatility) for one contract.
+    
+    The implied-volatility solver needs only these two, so this skips the
+    other Greeks that _bs_core computes on every iteration.
+    """
+    sqrt_t = sqrt(time_to_expiry)
+    v = volatility * sqrt_t
+    d1 = (log(spot / strike) + (risk_free_rate + 0.5 * volatility * volatility) * time_to_expiry) / v
+    d2 = d1 - v
+    discounted_strike = strike * exp(-risk_free_rate * time_to_expiry)
+    vega = spot * _INV_SQRT_2PI * exp(-0.5 * d1 * d1) * sqrt_t
+    
+    if is_call:
+        premium = spot * 0.5 * erfc(-d1 * _INV_SQRT2) - discounted_strike * 0.5 * erfc(-d2 * _INV_SQRT2)
+    else:
+        premium = discounted_strike * 0.5 * erfc(d2 * _INV_SQRT2) - spot * 0.5 * erfc(d1 * _INV_SQRT2)
+    return premium, vega
+
+
+# The JIT kernel, even once _bs_price_vega is rebound to the AOT build below
+_price_vega_jit = _bs_price_vega
+
+
+@njit(cache=True, fastmath=True)
+def _iv_newton(spot: float, strike: float, premium: float, time_to_expiry: float,
+               risk_free_rate: float, is_call: bool) -> float:
+    """
+    Unrounded implied volatility in [0.01, 2.0], solved entirely in compiled code.
+    
+    Newton-Raphson on the exact vega, falling back to bisection whenever a
+    step would leave the bracket; price rises with volatility, so the
+    bracket always holds the root and the loop always converges.
+    """
+    iv = 0.3
+    low, high = 0.01, 2.0
+    max_iterations = 50
+    tolerance = 0.0001
+    
+    for _ in range(max_iterations):
+        price, vega = _price_vega_jit(spot, strike, time_to_expiry, iv,
+                                      risk_free_rate, is_call)
+        price_diff = price - premium
+        
+        if abs(price_diff) < tolerance:
+            break
+        if price_diff > 0:
+            high = iv
+        else:
+            low = iv
+        
+        # Newton-Raphson update, or bisect when it would leave the bracket
+        step = iv - price_diff / vega if vega > 0 else low
+        iv = step if low < step < high else 0.5 * (low + high)
+        
+        if high - low < 1e-7:  # Premium outside the [0.01, 2.0] price range
+            break
+    
+    return iv
+
+
+# The JIT solver, for the batch kernel below (which is never built ahead of time)
+_iv_newton_jit = _iv_newton
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _iv_newton_batch(spot, strike, premium, time_to_expiry, risk_free_rate, is_call):
+    """_iv_newton over 1-D arrays of contracts (all T > 0), split across cores."""
+    out = np.empty(spot.shape[0])
+    for i in prange(spot.shape[0]):
+        out[i] = _iv_newton_jit(spot[i], strike[i], premium[i], time_to_expiry[i],
+                                risk_free_rate, is_call[i])
+    return out
+
+
+# Kernels built ahead of time by `python -m utils._compile_greeks`
+_AOT_KERNELS = {
+    "bs_core": (_bs_core, "UniTuple(f8, 6)(f8, f8, f8, f8, f8, b1)"),
+    "bs_price_vega": (_bs_price_vega, "UniTuple(f8, 2)(f8, f8, f8, f8, f8, b1)"),
+    "iv_newton": (_iv_newton, "f8(f8, f8, f8, f8, f8, b1)"),
+}
+
+try:
+    # Compiled extension: no JIT warm-up on interpreter start
+    from utils.greeks_aot import (
+        bs_core as _bs_core, bs_price_vega as _bs_price_vega, iv_newton as _iv_newton
+    )
+except ImportError:
+    # Warm up so the first call doesn't pay for JIT compilation
+    _bs_core(100.0, 100.0, 0.1, 0.2, 0.07, True)
+    _bs_price_vega(100.0, 100.0, 0.1, 0.2, 0.07, True)
+    _iv_newton(100.0, 100.0, 2.5, 0.1, 0.07, True)
+    # With the AOT kernels loaded the batch kernel compiles on first use
+    # instead, keeping interpreter start free of JIT work
+    if NUMBA_AVAILABLE:
+        _ones = np.ones(1)
+        _iv_newton_batch(_ones, _ones, _ones, _ones, 0.07, np.ones(1, dtype=np.bool_))
+        del _ones
+
 
 def calculate_greeks(spot: float, strike: float, time_to_expiry: float, 
                     volatility: float, risk_free_rate: float = 0.07,
@@ -29,28 +188,10 @@ def calculate_greeks(spot: float, strike: float, time_to_expiry: float,
             "vega": 0, "rho": 0, "premium": 0
         }
     
-    # Black-Scholes parameters
-    d1 = (np.log(spot / strike) + (risk_free_rate + 0.5 * volatility ** 2) * time_to_expiry) / \
-         (volatility * np.sqrt(time_to_expiry))
-    d2 = d1 - volatility * np.sqrt(time_to_expiry)
-    
-    # Calculate Greeks
-    if option_type == "CE":
-        delta = norm.cdf(d1)
-        premium = spot * norm.cdf(d1) - strike * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2)
-    else:  # PE
-        delta = -norm.cdf(-d1)
-        premium = strike * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(-d2) - spot * norm.cdf(-d1)
-    
-    gamma = norm.pdf(d1) / (spot * volatility * np.sqrt(time_to_expiry))
-    vega = spot * norm.pdf(d1) * np.sqrt(time_to_expiry) / 100  # Per 1% change in IV
-    theta = (-spot * norm.pdf(d1) * volatility / (2 * np.sqrt(time_to_expiry)) - 
-             risk_free_rate * strike * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2 if option_type == "CE" else -d2)) / 365
-    
-    if option_type == "CE":
-        rho = strike * time_to_expiry * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2) / 100
-    else:
-        rho = -strike * time_to_expiry * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(-d2) / 100
+    delta, gamma, theta, vega, rho, premium = _bs_core(
+        float(spot), float(strike), float(time_to_expiry), float(volatility),
+        float(risk_free_rate), option_type == "CE"
+    )
     
     return {
         "delta": round(delta, 4),
@@ -62,6 +203,102 @@ def calculate_greeks(spot: float, strike: float, time_to_expiry: float,
     }
 
 
+def calculate_greeks_vec(spot, strike, time_to_expiry, volatility,
+                         risk_free_rate: float = 0.07, is_call=True) -> dict:
+    """
+    Vectorized calculate_greeks over arrays of contracts (e.g. a whole chain).
+    
+    All arguments broadcast against each other. Values are unrounded but in
+    the same units as calculate_greeks, and all zero where time_to_expiry
+    <= 0.
+    
+    Args:
+        spot: Price(s) of underlying
+        strike: Strike price(s)
+        time_to_expiry: Time(s) to expiry in years
+        volatility: Implied volatility (annualized)
+        risk_free_rate: Risk-free rate (default 7% for India)
+        is_call: True for Call, False for Put (scalar or boolean array)
+    
+    Returns:
+        dict of arrays: delta, gamma, theta, vega, rho, premium
+    """
+    spot = np.asarray(spot, dtype=np.float64)
+    strike = np.asarray(strike, dtype=np.float64)
+    time_to_expiry = np.asarray(time_to_expiry, dtype=np.float64)
+    volatility = np.asarray(volatility, dtype=np.float64)
+    
+    expired = time_to_expiry <= 0
+    time_to_expiry = np.where(expired, 1.0, time_to_expiry)  # Priced, then zeroed
+    sqrt_t = np.sqrt(time_to_expiry)
+    discount = np.exp(-risk_free_rate * time_to_expiry)
+    
+    v = volatility * sqrt_t
+    d1 = (np.log(spot / strike) + (risk_free_rate + 0.5 * volatility ** 2) * time_to_expiry) / v
+    d2 = d1 - v
+    pdf_d1 = np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI
+    
+    # Φ(±d): calls use d1/d2, puts -d1/-d2, so both share one formula per Greek
+    sign = np.where(is_call, 1.0, -1.0)
+    nd1 = ndtr(sign * d1)
+    nd2 = ndtr(sign * d2)
+    discounted_strike = strike * discount
+    
+    greeks = {
+        "delta": sign * nd1,
+        "gamma": pdf_d1 / (spot * v),
+        "theta": (-spot * pdf_d1 * volatility / (2 * sqrt_t) -
+                  risk_free_rate * discounted_strike * nd2) / 365,
+        "vega": spot * pdf_d1 * sqrt_t / 100,  # Per 1% change in IV
+        "rho": sign * discounted_strike * time_to_expiry * nd2 / 100,
+        "premium": sign * (spot * nd1 - discounted_strike * nd2),
+    }
+    return {name: np.where(expired, 0.0, values) for name, values in greeks.items()}
+
+
+def black_scholes_premium(spot, strike, time_to_expiry, volatility,
+                          risk_free_rate: float = 0.07, is_call=True,
+                          sqrt_t=None, discount=None) -> np.ndarray:
+    """
+    Vectorized Black-Scholes premium over arrays of contracts.
+    
+    All arguments broadcast against each other, so a whole grid of
+    (spot, strike, expiry, vol, type) tuples is priced with one pass of
+    NumPy kernels instead of one calculate_greeks call per contract.
+    
+    Args:
+        spot: Price(s) of underlying
+        strike: Strike price(s)
+        time_to_expiry: Time(s) to expiry in years (must be > 0)
+        volatility: Implied volatility (annualized)
+        risk_free_rate: Risk-free rate (default 7% for India)
+        is_call: True for Call, False for Put (scalar or boolean array)
+        sqrt_t: Precomputed sqrt(time_to_expiry) (optional)
+        discount: Precomputed exp(-risk_free_rate * time_to_expiry) (optional)
+    
+    Returns:
+        Array of unrounded premiums
+    """
+    spot = np.asarray(spot, dtype=np.float64)
+    strike = np.asarray(strike, dtype=np.float64)
+    time_to_expiry = np.asarray(time_to_expiry, dtype=np.float64)
+    volatility = np.asarray(volatility, dtype=np.float64)
+    
+    if sqrt_t is None:
+        sqrt_t = np.sqrt(time_to_expiry)
+    if discount is None:
+        discount = np.exp(-risk_free_rate * time_to_expiry)
+    
+    d1 = (np.log(spot / strike) + (risk_free_rate + 0.5 * volatility ** 2) * time_to_expiry) / \
+         (volatility * sqrt_t)
+    d2 = d1 - volatility * sqrt_t
+    discounted_strike = strike * discount
+    
+    call = spot * ndtr(d1) - discounted_strike * ndtr(d2)
+    put = discounted_strike * ndtr(-d2) - spot * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
 def days_to_expiry(expiry_date: str) -> float:
     """
     Calculate days to expiry from expiry date string.
@@ -82,7 +319,11 @@ def estimate_implied_volatility(spot: float, strike: float, premium: float,
                                 time_to_expiry: float, option_type: str = "CE",
                                 risk_free_rate: float = 0.07) -> float:
     """
-    Estimate implied volatility using Newton-Raphson method.
+    Estimate implied volatility from an option's market price.
+    
+    Uses Jäckel's "Let's Be Rational" (machine precision in two steps) when
+    py_lets_be_rational is installed, otherwise Newton-Raphson on the exact
+    vega, safeguarded by bisection so it always converges.
     
     Args:
         spot: Current price of underlying
@@ -93,28 +334,90 @@ def estimate_implied_volatility(spot: float, strike: float, premium: float,
         risk_free_rate: Risk-free rate
     
     Returns:
-        Implied volatility (annualized)
+        Implied volatility (annualized), clamped to [0.01, 2.0]
     """
-    # Initial guess
+    # Initial guess (also the answer when there is no time value to invert)
     iv = 0.3
-    max_iterations = 100
-    tolerance = 0.0001
+    if time_to_expiry <= 0:
+        return iv
     
-    for _ in range(max_iterations):
-        greeks = calculate_greeks(spot, strike, time_to_expiry, iv, risk_free_rate, option_type)
-        price_diff = greeks["premium"] - premium
-        
-        if abs(price_diff) < tolerance:
-            return round(iv, 4)
-        
-        # Newton-Raphson update
-        vega = greeks["vega"] * 100  # Convert back to per 100% change
-        if vega == 0:
-            break
-        
-        iv = iv - price_diff / vega
-        
-        # Keep IV in reasonable bounds
-        iv = max(0.01, min(iv, 2.0))
+    low, high = 0.01, 2.0
+    is_call = option_type == "CE"
+    spot, strike, premium = float(spot), float(strike), float(premium)
+    time_to_expiry, risk_free_rate = float(time_to_expiry), float(risk_free_rate)
     
+    if LBR_AVAILABLE:
+        # Works on undiscounted prices against the forward
+        discount = exp(-risk_free_rate * time_to_expiry)
+        try:
+            iv = _lbr_implied_volatility(premium / discount, spot / discount, strike,
+                                         time_to_expiry, 1 if is_call else -1)
+        except BelowIntrinsicException:
+            iv = low
+        except AboveMaximumException:
+            iv = high
+        return round(max(low, min(iv, high)), 4)
+    
+    iv = _iv_newton(spot, strike, premium, time_to_expiry, risk_free_rate, is_call)
     return round(iv, 4)
+
+
+def estimate_implied_volatility_vec(spot, strike, premium, time_to_expiry,
+                                    is_call=True, risk_free_rate: float = 0.07) -> np.ndarray:
+    """
+    Vectorized implied volatility for a whole option chain at once.
+    
+    With Numba, every contract runs the compiled Newton-Raphson solver in
+    one parallel loop; otherwise all brackets are bisected in lockstep with
+    one black_scholes_premium pass per step, instead of a Python-level
+    solver run per strike. Bisection pins the root more tightly than the
+    Newton solver's price tolerance, so on deep quotes where the price
+    barely moves with volatility the two can disagree in the 4th decimal
+    or beyond.
+    
+    Args:
+        spot: Price(s) of underlying
+        strike: Strike price(s)
+        premium: Market price(s) of the options
+        time_to_expiry: Time(s) to expiry in years
+        is_call: True for Call, False for Put (scalar or boolean array)
+        risk_free_rate: Risk-free rate
+    
+    Returns:
+        Array of implied volatilities, clamped to [0.01, 2.0] (0.3 where
+        there is no time value to invert)
+    """
+    arrays = np.broadcast_arrays(
+        np.asarray(spot, dtype=np.float64), np.asarray(strike, dtype=np.float64),
+        np.asarray(premium, dtype=np.float64), np.asarray(time_to_expiry, dtype=np.float64),
+        np.asarray(is_call, dtype=np.bool_)
+    )
+    shape = arrays[0].shape
+    spot, strike, premium, time_to_expiry, is_call = (a.ravel() for a in arrays)
+    
+    iv = np.full(spot.shape, 0.3)
+    live = time_to_expiry > 0
+    if NUMBA_AVAILABLE:
+        iv[live] = _iv_newton_batch(spot[live], strike[live], premium[live],
+                                    time_to_expiry[live], risk_free_rate, is_call[live])
+    else:
+        iv[live] = _iv_bisect_vec(spot[live], strike[live], premium[live],
+                                  time_to_expiry[live], risk_free_rate, is_call[live])
+    return np.round(iv, 4).reshape(shape)
+
+
+def _iv_bisect_vec(spot, strike, premium, time_to_expiry, risk_free_rate, is_call):
+    """Bisect every contract's [0.01, 2.0] bracket together (all T > 0)."""
+    sqrt_t = np.sqrt(time_to_expiry)
+    discount = np.exp(-risk_free_rate * time_to_expiry)
+    
+    # 25 halvings shrink the bracket below 1e-7, well inside the rounding
+    low = np.full(premium.shape, 0.01)
+    high = np.full(premium.shape, 2.0)
+    for _ in range(25):
+        mid = 0.5 * (low + high)
+        too_high = black_scholes_premium(spot, strike, time_to_expiry, mid, risk_free_rate,
+                                         is_call, sqrt_t, discount) > premium
+        high = np.where(too_high, mid, high)
+        low = np.where(too_high, low, mid)
+    return 0.5 * (low + high)
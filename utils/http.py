@@ -0,0 +1,56 @@
+"""
+HTTP helpers for F&O Trading Agent
+"""
+import json
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on environment
+    ORJSON_AVAILABLE = False
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def make_session(headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """
+    Build a requests.Session that keeps connections alive between calls.
+    
+    Reusing pooled connections skips the TCP + TLS handshake on every
+    request after the first. Connection failures are retried twice with a
+    short backoff; POSTs are only retried when nothing was sent.
+    
+    Args:
+        headers: Default headers for every request (optional)
+    
+    Returns:
+        Configured session
+    """
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                          max_retries=Retry(total=2, backoff_factor=0.3))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def loads_json(content: bytes) -> Any:
+    """Parse a JSON response body, with orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Serialize a JSON request body (UTF-8), with orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
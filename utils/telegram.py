@@ -3,11 +3,20 @@ Telegram notification utilities for F&O Trading Agent
 Reuses TradeAgent Telegram configuration
 """
 import os
-import requests
+from typing import Dict, List
 from config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from utils.http import JSON_HEADERS, dumps_json, make_session
 
 AGENT_NAME = "F&O Agent"
 
+# One pooled connection to the Bot API, reused by every message
+_SESSION = make_session()
+
+# Fixed per process, so built once rather than per message
+_SEND_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+# Agent name prefix to distinguish from equity agent
+_MESSAGE_PREFIX = f"🔷 *{AGENT_NAME}*\n\n"
+
 
 def send_telegram_message(message: str) -> bool:
     """Send a message to Telegram with F&O agent prefix."""
@@ -15,18 +24,14 @@ def send_telegram_message(message: str) -> bool:
         print("  [Telegram not configured]")
         return False
     
-    # Add agent name prefix to distinguish from equity agent
-    prefixed_message = f"🔷 *{AGENT_NAME}*\n\n{message}"
-    
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
-        "text": prefixed_message,
+        "text": _MESSAGE_PREFIX + message,
         "parse_mode": "Markdown"
     }
     
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = _SESSION.post(_SEND_URL, data=dumps_json(payload), headers=JSON_HEADERS, timeout=10)
         if response.status_code == 200:
             print("  [Telegram] Message sent")
             return True
@@ -56,11 +61,11 @@ def send_entry_signal(symbol: str, option_type: str, strike: float, premium: flo
     return send_telegram_message(msg)
 
 
-def send_exit_signal(symbol: str, option_type: str, strike: float, entry_premium: float,
-                    exit_premium: float, pnl: float, reason: str):
-    """Send option exit signal to Telegram."""
+def _format_exit_signal(symbol: str, option_type: str, strike: float, entry_premium: float,
+                        exit_premium: float, pnl: float, reason: str) -> str:
+    """Format the body of an option exit signal."""
     emoji = "✅" if pnl > 0 else "❌"
-    msg = (
+    return (
         f"{emoji} *F&O EXIT SIGNAL*\n\n"
         f"📉 *{symbol} {strike} {option_type}*\n"
         f"💰 Entry Premium: ₹{entry_premium:.2f}\n"
@@ -68,6 +73,30 @@ def send_exit_signal(symbol: str, option_type: str, strike: float, entry_premium
         f"💸 P&L: ₹{pnl:+,.0f}\n"
         f"📌 Reason: {reason}"
     )
+
+
+def send_exit_signal(symbol: str, option_type: str, strike: float, entry_premium: float,
+                    exit_premium: float, pnl: float, reason: str):
+    """Send option exit signal to Telegram."""
+    msg = _format_exit_signal(symbol, option_type, strike, entry_premium,
+                              exit_premium, pnl, reason)
+    return send_telegram_message(msg)
+
+
+def send_batch_exit_signal(exits: List[Dict]):
+    """
+    Send several option exit signals to Telegram as one message.
+    
+    Args:
+        exits: List of dicts with the send_exit_signal keyword arguments
+    
+    Returns:
+        True if the message was sent (False when there is nothing to send)
+    """
+    if not exits:
+        return False
+    
+    msg = "\n\n".join(_format_exit_signal(**exit_signal) for exit_signal in exits)
     return send_telegram_message(msg)
 
 